@@ -0,0 +1,29 @@
+"""Бенчмарки проектов YaNews и YaNote.
+
+Запускаются из корня репозитория: python -m benchmarks.<модуль> --help.
+"""
+import os
+import sys
+from pathlib import Path
+
+import django
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+SETTINGS = {
+    'ya_news': 'yanews.settings',
+    'ya_note': 'yanote.settings',
+}
+
+
+def setup(project, database=None):
+    """Подключаем Django-проект так же, как это делает его manage.py.
+
+    database подменяет файл SQLite, чтобы не трогать рабочую базу.
+    """
+    sys.path.insert(0, str(ROOT_DIR / project))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', SETTINGS[project])
+    if database is not None:
+        from django.conf import settings
+
+        settings.DATABASES['default']['NAME'] = database
+    django.setup()
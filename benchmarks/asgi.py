@@ -0,0 +1,186 @@
+"""Синхронные и асинхронные представления YaNews под ASGI.
+
+Приложение из yanews/asgi.py вызывается напрямую из asyncio, как его
+вызывал бы uvicorn, с заданным числом одновременных соединений. Каждый
+режим (NEWS_ASYNC_VIEWS = False и True) запускается в отдельном процессе
+на общей базе benchmarks/ya_news_asgi.sqlite3; в конце печатаются RPS и
+p50/p95/p99 для главной и страницы новости.
+
+SQLite отвечает без сетевой задержки, поэтому --db-latency-ms добавляет к
+каждому запросу к БД паузу, как у сетевой СУБД. Без неё работа упирается
+в GIL, и оба режима показывают близкие цифры:
+
+python -m benchmarks.asgi --concurrency 64 --requests 5000
+python -m benchmarks.asgi --db-latency-ms 0
+"""
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from benchmarks import ROOT_DIR, setup
+from benchmarks.load import percentile
+
+MODES = ('sync', 'async')
+
+
+async def call(app, path, cookie):
+    """Один GET-запрос к ASGI-приложению; возвращает статус ответа."""
+    headers = [(b'host', b'localhost')]
+    if cookie:
+        headers.append((b'cookie', cookie.encode()))
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': b'',
+        'root_path': '',
+        'headers': headers,
+        'client': ('127.0.0.1', 50000),
+        'server': ('localhost', 80),
+    }
+    messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+    status = None
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+
+    await app(scope, receive, send)
+    return status
+
+
+async def run(app, requests, concurrency):
+    samples = defaultdict(list)
+    errors = defaultdict(int)
+    queue = asyncio.Queue()
+    for request in requests:
+        queue.put_nowait(request)
+
+    async def connection():
+        while not queue.empty():
+            name, path, cookie = queue.get_nowait()
+            started = time.perf_counter()
+            status = await call(app, path, cookie)
+            samples[name].append((time.perf_counter() - started) * 1000)
+            if status >= 400:
+                errors[name] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(connection() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+    return {
+        'requests_per_second': round(len(requests) / wall, 1),
+        'results': {
+            name: {
+                'errors': errors[name],
+                'p50_ms': round(percentile(values, 0.50), 2),
+                'p95_ms': round(percentile(values, 0.95), 2),
+                'p99_ms': round(percentile(values, 0.99), 2),
+            }
+            for name, values in sorted(samples.items())
+        },
+    }
+
+
+def measure(args):
+    """Замер одного режима; результат печатается в stdout как JSON."""
+    setup('ya_news', database=ROOT_DIR / 'benchmarks' / 'ya_news_asgi.sqlite3')
+    from django.conf import settings
+    from django.core.management import call_command
+
+    settings.DEBUG = False
+    settings.NEWS_ASYNC_VIEWS = args.mode == 'async'
+    call_command('migrate', verbosity=0)
+    if args.db_latency_ms:
+        from django.db.backends import utils
+
+        execute = utils.CursorWrapper.execute
+
+        def execute_with_latency(self, *execute_args, **kwargs):
+            time.sleep(args.db_latency_ms / 1000)
+            return execute(self, *execute_args, **kwargs)
+
+        utils.CursorWrapper.execute = execute_with_latency
+    from django.contrib.auth import get_user_model
+    from django.core.asgi import get_asgi_application
+    from django.test import Client
+    from django.urls import reverse
+
+    from benchmarks.load import NewsScenario
+    from news.models import News
+
+    rng = random.Random(args.seed)
+    if not News.objects.exists():
+        NewsScenario(args).seed(rng)
+    news_ids = list(News.objects.values_list('pk', flat=True)[:1000])
+    client = Client()
+    client.force_login(get_user_model().objects.order_by('pk').first())
+    cookie = f'sessionid={client.cookies["sessionid"].value}'
+    requests = []
+    for _ in range(args.requests // 3):
+        detail = reverse('news:detail', args=(rng.choice(news_ids),))
+        requests += [
+            ('home', reverse('news:home'), None),
+            ('detail', detail, None),
+            ('detail_user', detail, cookie),
+        ]
+    app = get_asgi_application()
+    report = asyncio.run(run(app, requests, args.concurrency))
+    print(json.dumps(report))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--news', type=int, default=1000)
+    parser.add_argument('--comments', type=int, default=20_000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=3000)
+    parser.add_argument('--db-latency-ms', type=float, default=2)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--mode', choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.mode:
+        measure(args)
+        return
+
+    reports = {}
+    for mode in MODES:
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.asgi', *sys.argv[1:],
+             '--mode', mode],
+            cwd=ROOT_DIR, check=True, capture_output=True, text=True,
+        ).stdout
+        reports[mode] = json.loads(output.splitlines()[-1])
+    print(f'{"режим":<8}{"URL":<13}{"ошибок":>8}{"p50":>9}{"p95":>9}'
+          f'{"p99":>9}')
+    for mode, report in reports.items():
+        for name, result in report['results'].items():
+            print(
+                f'{mode:<8}{name:<13}{result["errors"]:>8}'
+                f'{result["p50_ms"]:>9}{result["p95_ms"]:>9}'
+                f'{result["p99_ms"]:>9}'
+            )
+    for mode, report in reports.items():
+        print(f'RPS {mode}: {report["requests_per_second"]}')
+
+
+if __name__ == '__main__':
+    main()
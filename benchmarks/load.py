@@ -0,0 +1,346 @@
+"""Нагрузочный прогон всех URL проекта через тестовый клиент Django.
+
+Наполняет отдельную базу benchmarks/<проект>.sqlite3, прогоняет каждый
+URL из news/urls.py или notes/urls.py в несколько потоков и печатает
+p50/p95/p99, число запросов к БД на ответ и пиковый RSS процесса.
+База наполняется в отдельном процессе, поэтому RSS относится только к
+прогону. Маршруты приложения, которых нет в сценарии, выводятся
+предупреждением. Результат можно сохранить как базовый и сравнивать с
+ним следующие прогоны:
+
+python -m benchmarks.load ya_news --news 100000 --comments 10000000
+python -m benchmarks.load ya_note --users 10000 --notes 1000000 \
+    --save baseline.json
+python -m benchmarks.load ya_note --compare baseline.json
+"""
+import argparse
+import json
+import random
+import resource
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import ROOT_DIR, setup
+
+BATCH_SIZE = 10_000
+
+
+def percentile(values, share):
+    """Процентиль по ближайшему рангу."""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(share * len(ordered)) - 1))
+    return ordered[index]
+
+
+def bulk_insert(model, objects):
+    from django.db import transaction
+
+    batch = []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) == BATCH_SIZE:
+            with transaction.atomic():
+                model.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        with transaction.atomic():
+            model.objects.bulk_create(batch)
+
+
+def create_users(count):
+    from django.contrib.auth import get_user_model
+
+    User = get_user_model()
+    bulk_insert(User, (
+        User(username=f'user{index}') for index in range(count)
+    ))
+    return list(User.objects.order_by('pk').values_list('pk', flat=True))
+
+
+class NewsScenario:
+    project = 'ya_news'
+    urls_module = 'news.urls'
+
+    def __init__(self, args):
+        self.args = args
+
+    def seed(self, rng):
+        from news.models import Comment, News, make_summary
+
+        user_ids = create_users(self.args.users)
+        text = 'Текст новости. ' * 50
+        bulk_insert(News, (
+            News(
+                title=f'Новость {index}', text=text,
+                summary=make_summary(text),
+            )
+            for index in range(self.args.news)
+        ))
+        news_ids = list(News.objects.values_list('pk', flat=True))
+        bulk_insert(Comment, (
+            Comment(
+                news_id=rng.choice(news_ids),
+                author_id=rng.choice(user_ids),
+                text=f'Комментарий {index}',
+            )
+            for index in range(self.args.comments)
+        ))
+        News.objects.recount_comments()
+
+    def prepare(self, rng):
+        from news.models import Comment
+
+        self.news_ids = list(
+            Comment.objects.values_list('news_id', flat=True).distinct()[:1000]
+        )
+        self.comments = list(
+            Comment.objects.values_list('pk', 'author_id')[:1000]
+        )
+
+    def requests(self, rng):
+        """Тройки (имя URL, id автора запроса или None, адрес)."""
+        from django.urls import reverse
+
+        news_id = rng.choice(self.news_ids)
+        comment_id, author_id = rng.choice(self.comments)
+        return (
+            ('news:home', None, reverse('news:home')),
+            ('news:search', None, reverse('news:search') + '?q=Новость'),
+            ('news:rss', None, reverse('news:rss')),
+            ('news:atom', None, reverse('news:atom')),
+            ('news:api_news', None, reverse('news:api_news')),
+            ('news:detail', None, reverse('news:detail', args=(news_id,))),
+            ('news:detail', author_id,
+             reverse('news:detail', args=(news_id,))),
+            ('news:comments', None,
+             reverse('news:comments', args=(news_id,))),
+            ('news:edit', author_id, reverse('news:edit', args=(comment_id,))),
+            ('news:delete', author_id,
+             reverse('news:delete', args=(comment_id,))),
+        )
+
+
+class NoteScenario:
+    project = 'ya_note'
+    urls_module = 'notes.urls'
+
+    def __init__(self, args):
+        self.args = args
+
+    def seed(self, rng):
+        from notes.models import Note
+
+        user_ids = create_users(self.args.users)
+        bulk_insert(Note, (
+            Note(
+                title=f'Заметка {index}',
+                text='Текст заметки. ' * 20,
+                slug=f'note-{index}',
+                author_id=rng.choice(user_ids),
+            )
+            for index in range(self.args.notes)
+        ))
+
+    def prepare(self, rng):
+        from notes.models import Note
+
+        self.notes = list(Note.objects.values_list('slug', 'author_id')[:1000])
+
+    def requests(self, rng):
+        from django.urls import reverse
+
+        slug, author_id = rng.choice(self.notes)
+        return (
+            ('notes:home', None, reverse('notes:home')),
+            ('notes:add', author_id, reverse('notes:add')),
+            ('notes:list', author_id, reverse('notes:list')),
+            ('notes:search', author_id,
+             reverse('notes:search') + '?q=Заметка'),
+            ('notes:success', author_id, reverse('notes:success')),
+            ('notes:detail', author_id, reverse('notes:detail', args=(slug,))),
+            ('notes:edit', author_id, reverse('notes:edit', args=(slug,))),
+            ('notes:delete', author_id, reverse('notes:delete', args=(slug,))),
+        )
+
+
+SCENARIOS = {'ya_news': NewsScenario, 'ya_note': NoteScenario}
+
+
+def uncovered(scenario, rng):
+    """Имена маршрутов приложения, которые сценарий не запрашивает."""
+    from importlib import import_module
+
+    urls = import_module(scenario.urls_module)
+    covered = {name for name, _, _ in scenario.requests(rng)}
+    return sorted(
+        f'{urls.app_name}:{pattern.name}' for pattern in urls.urlpatterns
+        if f'{urls.app_name}:{pattern.name}' not in covered
+    )
+
+
+def run(scenario, args):
+    from django.contrib.auth import get_user_model
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+
+    User = get_user_model()
+    samples = defaultdict(list)
+    errors = defaultdict(int)
+    lock = threading.Lock()
+
+    def worker(seed):
+        rng = random.Random(seed)
+        clients = {}
+        for _ in range(args.requests // args.concurrency):
+            for name, author_id, url in scenario.requests(rng):
+                client = clients.get(author_id)
+                if client is None:
+                    client = clients[author_id] = Client()
+                    if author_id is not None:
+                        client.force_login(User.objects.get(pk=author_id))
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    response = client.get(url)
+                    if response.streaming:
+                        b''.join(response.streaming_content)
+                    elapsed = (time.perf_counter() - started) * 1000
+                with lock:
+                    samples[name].append((elapsed, len(queries)))
+                    if response.status_code >= 400:
+                        errors[name] += 1
+        connection.close()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as executor:
+        list(executor.map(worker, range(args.concurrency)))
+    wall = time.perf_counter() - started
+    results = {}
+    for name, values in sorted(samples.items()):
+        latencies = [latency for latency, _ in values]
+        results[name] = {
+            'requests': len(values),
+            'errors': errors[name],
+            'p50_ms': round(percentile(latencies, 0.50), 2),
+            'p95_ms': round(percentile(latencies, 0.95), 2),
+            'p99_ms': round(percentile(latencies, 0.99), 2),
+            'queries': round(sum(q for _, q in values) / len(values), 2),
+        }
+    return {
+        'project': scenario.project,
+        'params': vars(args),
+        'requests_per_second': round(
+            sum(len(values) for values in samples.values()) / wall, 1
+        ),
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        'results': results,
+    }
+
+
+def compare(report, baseline, tolerance):
+    """Список регрессий относительно базового прогона."""
+    regressions = []
+    for name, result in report['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            continue
+        if result['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+            regressions.append(
+                f'{name}: p95 {base["p95_ms"]} -> {result["p95_ms"]} мс'
+            )
+        if result['queries'] > base['queries']:
+            regressions.append(
+                f'{name}: запросов {base["queries"]} -> {result["queries"]}'
+            )
+    if report['peak_rss_kb'] > baseline['peak_rss_kb'] * (1 + tolerance):
+        regressions.append(
+            f'RSS {baseline["peak_rss_kb"]} -> {report["peak_rss_kb"]} КБ'
+        )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument('project', choices=SCENARIOS)
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--news', type=int, default=1000)
+    parser.add_argument('--comments', type=int, default=20_000)
+    parser.add_argument('--notes', type=int, default=20_000)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument(
+        '--requests', type=int, default=200,
+        help='Сколько раз пройти по всем URL (суммарно по потокам).'
+    )
+    parser.add_argument(
+        '--reseed', action='store_true',
+        help='Пересоздать базу, даже если она уже наполнена.'
+    )
+    parser.add_argument('--save', help='Сохранить результат в JSON.')
+    parser.add_argument('--compare', help='Сравнить с сохранённым JSON.')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument(
+        '--seed-only', action='store_true',
+        help='Только наполнить базу; так main() запускает себя для seed().'
+    )
+    args = parser.parse_args()
+
+    database = ROOT_DIR / 'benchmarks' / f'{args.project}.sqlite3'
+    if args.reseed:
+        database.unlink(missing_ok=True)
+    if not args.seed_only and not database.exists():
+        # Пик RSS за время жизни процесса не сбросить, поэтому память на
+        # наполнение базы тратит дочерний процесс.
+        started = time.perf_counter()
+        subprocess.run(
+            [sys.executable, '-m', 'benchmarks.load', *sys.argv[1:],
+             '--seed-only'],
+            cwd=ROOT_DIR, check=True,
+        )
+        print(f'База наполнена за {time.perf_counter() - started:.1f} с')
+    setup(args.project, database=database)
+    from django.conf import settings
+    from django.core.management import call_command
+
+    settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, 'testserver']
+    call_command('migrate', verbosity=0)
+    rng = random.Random(args.seed)
+    scenario = SCENARIOS[args.project](args)
+    if args.seed_only:
+        scenario.seed(rng)
+        return
+    scenario.prepare(rng)
+    for name in uncovered(scenario, rng):
+        print(f'Маршрут {name} не входит в сценарий')
+    report = run(scenario, args)
+
+    print(f'{"URL":<16}{"запросов":>9}{"ошибок":>8}{"p50":>9}{"p95":>9}'
+          f'{"p99":>9}{"SQL":>7}')
+    for name, result in report['results'].items():
+        print(
+            f'{name:<16}{result["requests"]:>9}{result["errors"]:>8}'
+            f'{result["p50_ms"]:>9}{result["p95_ms"]:>9}'
+            f'{result["p99_ms"]:>9}{result["queries"]:>7}'
+        )
+    print(f'RPS: {report["requests_per_second"]}, '
+          f'пиковый RSS: {report["peak_rss_kb"]} КБ')
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as file:
+            regressions = compare(report, json.load(file), args.tolerance)
+        for regression in regressions:
+            print(f'Регрессия: {regression}')
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
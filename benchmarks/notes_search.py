@@ -0,0 +1,114 @@
+"""Скорость поиска по заметкам YaNote.
+
+Наполняет отдельную базу benchmarks/ya_note_search_*.sqlite3 заметками из
+случайных русских слов, строит поисковый индекс и замеряет поиск
+пользователя по одному и двум словам. Завершается с ошибкой, если p95
+больше бюджета:
+
+python -m benchmarks.notes_search --notes 1000000 --users 10000
+python -m benchmarks.notes_search --backend terms
+"""
+import argparse
+import random
+import sys
+import time
+
+from benchmarks import ROOT_DIR, setup
+from benchmarks.load import bulk_insert, create_users, percentile
+
+SYLLABLES = (
+    'ба', 'ве', 'го', 'ду', 'же', 'зи', 'ко', 'ла', 'ми', 'но', 'пу', 'ре',
+    'са', 'ти', 'фо', 'ху', 'це', 'ча', 'ши', 'ще',
+)
+ENDINGS = ('', 'а', 'ы', 'ой', 'ами', 'ах', 'ение', 'ить', 'ает', 'ые')
+
+
+def make_vocabulary(rng, size):
+    return [
+        ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+        for _ in range(size)
+    ]
+
+
+def make_text(rng, vocabulary, words):
+    return ' '.join(
+        rng.choice(vocabulary) + rng.choice(ENDINGS) for _ in range(words)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--notes', type=int, default=100_000)
+    parser.add_argument('--vocabulary', type=int, default=20_000)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument(
+        '--backend', choices=('auto', 'terms'), default='auto',
+        help='terms — встроенный индекс NoteTerm вместо FTS5.'
+    )
+    parser.add_argument('--budget-ms', type=float, default=10)
+    parser.add_argument('--reseed', action='store_true')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    database = (
+        ROOT_DIR / 'benchmarks' / f'ya_note_search_{args.backend}.sqlite3'
+    )
+    if args.reseed:
+        database.unlink(missing_ok=True)
+    fresh = not database.exists()
+    setup('ya_note', database=database)
+    from django.core.management import call_command
+    from django.db import connection, transaction
+
+    from notes import search
+    from notes.models import Note
+
+    call_command('migrate', verbosity=0)
+    if args.backend == 'terms':
+        search.use_fts.cache[connection.settings_dict['NAME']] = False
+    rng = random.Random(args.seed)
+    vocabulary = make_vocabulary(rng, args.vocabulary)
+    if fresh:
+        started = time.perf_counter()
+        user_ids = create_users(args.users)
+        bulk_insert(Note, (
+            Note(
+                title=make_text(rng, vocabulary, 3),
+                text=make_text(rng, vocabulary, 40),
+                slug=f'note-{index}',
+                author_id=rng.choice(user_ids),
+            )
+            for index in range(args.notes)
+        ))
+        with transaction.atomic():
+            search.rebuild_index()
+        print(f'База и индекс готовы за {time.perf_counter() - started:.1f} с')
+    print(f'Индекс: {"FTS5" if search.use_fts() else "NoteTerm"}')
+
+    user_ids = list(Note.objects.values_list('author_id', flat=True)[:1000])
+    latencies = []
+    found = 0
+    for _ in range(args.queries):
+        query = ' '.join(
+            rng.choice(vocabulary) + rng.choice(ENDINGS)
+            for _ in range(rng.randint(1, 2))
+        )
+        started = time.perf_counter()
+        found += len(search.search(rng.choice(user_ids), query, 0, 20))
+        latencies.append((time.perf_counter() - started) * 1000)
+    p95 = percentile(latencies, 0.95)
+    print(
+        f'Запросов: {args.queries}, найдено в среднем: '
+        f'{found / args.queries:.2f}, p50 {percentile(latencies, 0.5):.2f} '
+        f'мс, p95 {p95:.2f} мс, p99 {percentile(latencies, 0.99):.2f} мс'
+    )
+    if p95 > args.budget_ms:
+        print(f'p95 больше бюджета {args.budget_ms} мс')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
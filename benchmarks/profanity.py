@@ -0,0 +1,65 @@
+"""Сравнение автомата Ахо — Корасик с проверкой слов в цикле.
+
+python -m benchmarks.profanity --words 10000 --text-length 20000
+"""
+import argparse
+import random
+import timeit
+
+from benchmarks import setup
+
+ALPHABET = 'абвгдежзийклмнопрстуфхцчшщыьэюя'
+
+
+def random_word(rng, min_length=5, max_length=12):
+    length = rng.randint(min_length, max_length)
+    return ''.join(rng.choice(ALPHABET) for _ in range(length))
+
+
+def loop_search(words, text):
+    """Прежняя реализация CommentForm.clean_text."""
+    lowered_text = text.lower()
+    for word in words:
+        if word in lowered_text:
+            return True
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--words', type=int, default=10_000)
+    parser.add_argument('--text-length', type=int, default=20_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    setup('ya_news')
+    from news.profanity import Matcher
+
+    rng = random.Random(args.seed)
+    words = [random_word(rng) for _ in range(args.words)]
+    text = ''
+    while len(text) < args.text_length:
+        text += random_word(rng, 2, 4) + ' '
+    text = text[:args.text_length]
+    # Худший случай для цикла: ни одно слово не встречается в тексте.
+    words = [word for word in words if word not in text]
+
+    build = min(timeit.repeat(lambda: Matcher(words), number=1, repeat=3))
+    matcher = Matcher(words)
+    assert matcher.search(text) == loop_search(words, text)
+    results = {
+        'цикл по словам': lambda: loop_search(words, text),
+        'Ахо — Корасик': lambda: matcher.search(text),
+    }
+    print(
+        f'Слов: {len(words)}, длина текста: {len(text)}, '
+        f'сборка автомата: {build * 1000:.1f} мс'
+    )
+    for name, func in results.items():
+        best = min(timeit.repeat(func, number=1, repeat=args.repeat))
+        print(f'{name:>16}: {best * 1000:8.2f} мс на проверку')
+
+
+if __name__ == '__main__':
+    main()
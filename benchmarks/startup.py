@@ -0,0 +1,157 @@
+"""Старт и стоимость запроса с обычными и продакшен-настройками.
+
+Каждый профиль запускается в отдельном процессе на общей базе
+benchmarks/<проект>_startup.sqlite3. Замеряются django.setup(), первый
+запрос (компиляция шаблонов и соединение с БД) и следующие запросы
+авторизованного пользователя через WSGI-обработчик проекта (с прогревом
+шаблонов), а также число открытых за это время соединений с БД:
+
+python -m benchmarks.startup ya_news --requests 500
+python -m benchmarks.startup ya_note
+"""
+import argparse
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from importlib import import_module
+
+from benchmarks import ROOT_DIR, SETTINGS, setup
+from benchmarks.load import SCENARIOS, percentile
+
+PROFILES = ('settings', 'settings_production')
+
+
+def measure(args):
+    """Замер одного профиля; результат печатается в stdout как JSON."""
+    started = time.perf_counter()
+    setup(args.project, database=(
+        ROOT_DIR / 'benchmarks' / f'{args.project}_startup.sqlite3'
+    ))
+    setup_ms = (time.perf_counter() - started) * 1000
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.core.management import call_command
+    from django.db import connection
+    from django.db.backends.signals import connection_created
+    from django.test import Client
+
+    call_command('migrate', verbosity=0)
+    rng = random.Random(args.seed)
+    scenario = SCENARIOS[args.project](args)
+    if not get_user_model().objects.exists():
+        scenario.seed(rng)
+    scenario.prepare(rng)
+    cookies = {}
+    # Модуль wsgi проекта, как на сервере: вместе с прогревом шаблонов.
+    application = import_module(
+        SETTINGS[args.project].replace('settings', 'wsgi')
+    ).application
+
+    def request(author_id, url):
+        """Запрос через WSGI: тестовый клиент не закрывает соединения."""
+        path, _, query = url.partition('?')
+        environ = {
+            'REQUEST_METHOD': 'GET',
+            'PATH_INFO': path,
+            'QUERY_STRING': query,
+            'SERVER_NAME': 'localhost',
+            'SERVER_PORT': '80',
+            'HTTP_HOST': 'localhost',
+            'HTTP_COOKIE': cookies[author_id],
+            'wsgi.input': io.BytesIO(),
+            'wsgi.errors': sys.stderr,
+            'wsgi.url_scheme': 'http',
+        }
+        started = time.perf_counter()
+        response = application(environ, lambda status, headers: None)
+        b''.join(response)
+        response.close()
+        return (time.perf_counter() - started) * 1000
+
+    requests = [
+        (author_id, url)
+        for _ in range(args.requests)
+        for _, author_id, url in scenario.requests(rng)
+        if author_id is not None
+    ]
+    for author_id in {author_id for author_id, _ in requests}:
+        client = Client()
+        client.force_login(get_user_model().objects.get(pk=author_id))
+        cookies[author_id] = client.cookies[
+            settings.SESSION_COOKIE_NAME
+        ].output(header='').strip()
+    connection.close()
+    connects = []
+
+    def count_connection(**kwargs):
+        connects.append(1)
+
+    connection_created.connect(count_connection)
+    first_ms = request(*requests[0])
+    latencies = [request(*item) for item in requests[1:]]
+    print(json.dumps({
+        'setup_ms': round(setup_ms, 1),
+        'first_ms': round(first_ms, 2),
+        'mean_ms': round(sum(latencies) / len(latencies), 3),
+        'p95_ms': round(percentile(latencies, 0.95), 3),
+        'connections': len(connects),
+        'requests': len(requests),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument('project', choices=SETTINGS)
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--news', type=int, default=1000)
+    parser.add_argument('--comments', type=int, default=20_000)
+    parser.add_argument('--notes', type=int, default=20_000)
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--profile', choices=PROFILES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.profile:
+        measure(args)
+        return
+
+    package = SETTINGS[args.project].split('.')[0]
+    reports = {}
+    with tempfile.TemporaryDirectory() as data_dir:
+        os.mkdir(os.path.join(data_dir, 'sessions'))
+        for profile in PROFILES:
+            output = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.startup', *sys.argv[1:],
+                 '--profile', profile],
+                cwd=ROOT_DIR, check=True, capture_output=True, text=True,
+                env={
+                    **os.environ,
+                    'DJANGO_SETTINGS_MODULE': f'{package}.{profile}',
+                    'DJANGO_DATA_DIR': data_dir,
+                    'DJANGO_SECRET_KEY': 'benchmark-secret-key',
+                },
+            ).stdout
+            reports[profile] = json.loads(output.splitlines()[-1])
+    print(f'{"профиль":<21}{"setup":>8}{"первый":>9}{"среднее":>9}'
+          f'{"p95":>9}{"соединений":>12}')
+    for profile, report in reports.items():
+        print(
+            f'{profile:<21}{report["setup_ms"]:>8}{report["first_ms"]:>9}'
+            f'{report["mean_ms"]:>9}{report["p95_ms"]:>9}'
+            f'{report["connections"]:>12}'
+        )
+    base, production = reports['settings'], reports['settings_production']
+    saved = base['mean_ms'] - production['mean_ms']
+    print(f'Экономия на запрос: {saved:.3f} мс '
+          f'({saved / base["mean_ms"]:.0%}), '
+          f'запросов: {production["requests"]}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Время прогона тестов обоих проектов: по очереди и параллельно.
+
+По очереди тесты запускает run_tests.sh. Параллельно оба проекта
+запускаются одновременно отдельными процессами, а с --workers каждый
+проект ещё и делится между процессами pytest-xdist. Каждый процесс
+работает со своей базой: YaNews с базой в памяти, YaNote с файлом
+test_db.sqlite3_gw<N>, суффикс добавляет pytest-django.
+
+python -m benchmarks.suites
+python -m benchmarks.suites --workers 2
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks import ROOT_DIR, SETTINGS
+
+
+def start(project, workers):
+    command = [sys.executable, '-m', 'pytest', '-q', '-p', 'no:warnings']
+    if workers:
+        command += ['-n', str(workers)]
+    return subprocess.Popen(
+        command, cwd=ROOT_DIR / project,
+        env={**os.environ, 'DJANGO_SETTINGS_MODULE': SETTINGS[project]},
+        stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+    )
+
+
+def finish(process, project):
+    output, _ = process.communicate()
+    if process.returncode:
+        print(output)
+        sys.exit(f'Тесты {project} упали')
+    return output.strip().splitlines()[-1]
+
+
+def sequential():
+    started = time.perf_counter()
+    for project in SETTINGS:
+        print(f'{project}: {finish(start(project, 0), project)}')
+    return time.perf_counter() - started
+
+
+def parallel(workers):
+    started = time.perf_counter()
+    processes = {project: start(project, workers) for project in SETTINGS}
+    for project, process in processes.items():
+        print(f'{project}: {finish(process, project)}')
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument(
+        '--workers', type=int, default=0,
+        help='Процессов pytest-xdist на проект; 0 — без xdist.'
+    )
+    args = parser.parse_args()
+    serial = sequential()
+    print(f'По очереди: {serial:.2f} с')
+    concurrent = parallel(args.workers)
+    print(f'Параллельно: {concurrent:.2f} с, '
+          f'ускорение {serial / concurrent:.2f}x, '
+          f'ядер {os.cpu_count()}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""reverse() против fast_reverse() для ссылок в строках списков.
+
+Сравниваются отдельные вызовы и рендер цикла в шаблоне с {% url %} и
+{% fast_url %} на --rows строк:
+
+python -m benchmarks.urls ya_news --rows 5000
+python -m benchmarks.urls ya_note
+"""
+import argparse
+import time
+from importlib import import_module
+
+from benchmarks import SETTINGS, setup
+
+ROW_LINKS = {
+    'ya_news': (
+        ('news:edit', lambda index: index),
+        ('news:delete', lambda index: index),
+        ('news:detail', lambda index: index),
+    ),
+    'ya_note': (
+        ('notes:detail', lambda index: f'note-{index}'),
+    ),
+}
+ROW_TEMPLATE = '{%% load fast_url %%}{%% for value in values %%}' \
+    '<a href="{%% %s %s value %%}"></a>{%% endfor %%}'
+
+
+def best_of(repeat, function):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument('project', choices=SETTINGS)
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    setup(args.project)
+    from django.template import Context, Template
+    from django.urls import reverse
+
+    fast_reverse = import_module(
+        SETTINGS[args.project].replace('settings', 'urlbuilder')
+    ).fast_reverse
+
+    print(f'{"URL":<14}{"способ":<14}{"мс":>9}{"мкс/ссылка":>12}')
+    for name, make_value in ROW_LINKS[args.project]:
+        values = [make_value(index) for index in range(1, args.rows + 1)]
+        assert [fast_reverse(name, value) for value in values] == [
+            reverse(name, args=(value,)) for value in values
+        ]
+        results = {
+            'reverse': best_of(args.repeat, lambda: [
+                reverse(name, args=(value,)) for value in values
+            ]),
+            'fast_reverse': best_of(args.repeat, lambda: [
+                fast_reverse(name, value) for value in values
+            ]),
+        }
+        context = Context({'values': values})
+        for tag in ('url', 'fast_url'):
+            template = Template(ROW_TEMPLATE % (tag, repr(name)))
+            results[f'{{% {tag} %}}'] = best_of(
+                args.repeat, lambda: template.render(context)
+            )
+        for method, elapsed in results.items():
+            print(f'{name:<14}{method:<14}{elapsed:>9.2f}'
+                  f'{elapsed * 1000 / args.rows:>12.2f}')
+        calls = results['reverse'] / results['fast_reverse']
+        rendering = results['{% url %}'] / results['{% fast_url %}']
+        print(f'{name:<14}ускорение: вызовы {calls:.1f}x, '
+              f'шаблон {rendering:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
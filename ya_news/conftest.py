@@ -0,0 +1,8 @@
+from django.conf import settings
+
+
+def pytest_configure(config):
+    # PBKDF2 в admin_user занимает больше, чем сам тест.
+    settings.PASSWORD_HASHERS = (
+        'django.contrib.auth.hashers.MD5PasswordHasher',
+    )
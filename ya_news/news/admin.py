@@ -1,15 +1,130 @@
+from collections import defaultdict
+
+from django.conf import settings
 from django.contrib import admin
+from django.db import connections, transaction
+from django.db.models import Count
+from django.urls import reverse
+from django.utils.html import format_html, format_html_join
+from django.utils.text import Truncator
 
+from .cache import HOME_VERSION_KEY, NEWS_VERSION_KEY, invalidate
 from .models import Comment, News
 
+MODERATED_TEXT = '[удалено модератором]'
+
+
+def invalidate_comments_news(news_ids, home=True):
+    keys = [NEWS_VERSION_KEY.format(pk=news_id) for news_id in news_ids]
+    if home:
+        keys.append(HOME_VERSION_KEY)
+    invalidate(*keys)
 
-class CommentInline(admin.StackedInline):
-    model = Comment
-    extra = 0
+
+def delete_rows(queryset):
+    """Один DELETE по выборке, без загрузки объектов, сигналов и каскадов.
+
+    Вызывающий сам поправляет счётчики и сбрасывает кеш.
+    """
+    connection = connections[queryset.db]
+    quote = connection.ops.quote_name
+    meta = queryset.model._meta
+    sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {quote(meta.db_table)} '
+            f'WHERE {quote(meta.pk.column)} IN ({sql})', params
+        )
+        return cursor.rowcount
 
 
 @admin.register(News)
 class NewsAdmin(admin.ModelAdmin):
-    inlines = [
-        CommentInline,
-    ]
+    """Новости без инлайна: комментарии смотрят в CommentAdmin."""
+    list_display = ('title', 'date', 'comment_count')
+    search_fields = ('title',)
+    readonly_fields = ('comment_count', 'comments_summary')
+    show_full_result_count = False
+
+    @admin.display(description='Последние комментарии')
+    def comments_summary(self, obj):
+        """Несколько последних комментариев и ссылка на все остальные."""
+        if obj.pk is None:
+            return '—'
+        comments = Comment.objects.filter(news=obj).select_related(
+            'author'
+        ).order_by('-created', '-id')[:settings.NEWS_ADMIN_COMMENTS]
+        rows = format_html_join('', '<li>{} ({}): {}</li>', (
+            (
+                comment.author.username,
+                comment.created.strftime('%d.%m.%Y %H:%M'),
+                Truncator(comment.text).chars(100),
+            )
+            for comment in comments
+        ))
+        url = reverse('admin:news_comment_changelist')
+        return format_html(
+            '<ul>{}</ul><a href="{}?news__id__exact={}">Все комментарии '
+            '({})</a>',
+            rows, url, obj.pk, obj.comment_count
+        )
+
+
+@admin.register(Comment)
+class CommentAdmin(admin.ModelAdmin):
+    """Комментарии постранично; действия выполняются одним запросом."""
+    list_display = ('id', 'short_text', 'news', 'author', 'created')
+    list_select_related = ('news', 'author')
+    search_fields = ('text', 'author__username', 'news__title')
+    raw_id_fields = ('news', 'author')
+    ordering = ('-id',)
+    list_per_page = 100
+    # COUNT(*) по всей таблице на каждой странице списка не нужен.
+    show_full_result_count = False
+    actions = ('delete_comments', 'hide_comments')
+
+    @admin.display(description='Текст')
+    def short_text(self, obj):
+        return Truncator(obj.text).chars(80)
+
+    def get_actions(self, request):
+        """Стандартное удаление загружает и удаляет объекты по одному."""
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+
+    @admin.action(
+        description='Удалить выбранные комментарии',
+        permissions=('delete',),
+    )
+    def delete_comments(self, request, queryset):
+        with transaction.atomic():
+            by_count = defaultdict(list)
+            for news_id, removed in queryset.order_by().values(
+                'news_id'
+            ).annotate(removed=Count('pk')).values_list('news_id', 'removed'):
+                by_count[removed].append(news_id)
+            # queryset.delete() загрузил бы комментарии и сдвигал счётчик
+            # сигналом на каждый из них.
+            deleted = delete_rows(queryset)
+            for removed, news_ids in by_count.items():
+                News.objects.filter(
+                    pk__in=news_ids
+                ).shift_comment_count(-removed)
+            invalidate_comments_news(
+                news_id for news_ids in by_count.values()
+                for news_id in news_ids
+            )
+        self.message_user(request, f'Удалено комментариев: {deleted}')
+
+    @admin.action(
+        description='Скрыть текст выбранных комментариев',
+        permissions=('change',),
+    )
+    def hide_comments(self, request, queryset):
+        news_ids = set(queryset.values_list('news_id', flat=True))
+        with transaction.atomic():
+            updated = queryset.update(text=MODERATED_TEXT)
+            # Текст комментариев есть только на странице новости.
+            invalidate_comments_news(news_ids, home=False)
+        self.message_user(request, f'Скрыто комментариев: {updated}')
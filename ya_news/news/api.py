@@ -0,0 +1,46 @@
+"""JSON-лента новостей для мобильных клиентов и агрегаторов.
+
+Под WSGI ответ собирается по мере чтения строк из БД через .iterator(),
+поэтому даже выгрузка всех новостей одной страницей не держит их в
+памяти. Под ASGI Django 3.2 не умеет отдавать такой поток, и документ
+собирается целиком в потоке представления (см. NewsFeedJSON).
+Страницы идут по индексу (-date, id), а курсор указывает на последнюю
+отданную новость.
+"""
+import json
+
+from django.db.models import Q
+from django.urls import reverse
+
+from .models import News
+from .pagination import encode_cursor
+
+FEED_FIELDS = ('id', 'title', 'summary', 'date', 'comment_count')
+CHUNK_SIZE = 500
+
+
+def get_feed_rows(cursor, limit):
+    """Новости страницы и ещё одна, по которой видно продолжение."""
+    news = News.objects.order_by('-date', 'id')
+    if cursor is not None:
+        date, pk = cursor
+        news = news.filter(
+            Q(date__lte=date) & (Q(date__lt=date) | Q(pk__gt=pk))
+        )
+    return news.values(*FEED_FIELDS)[:limit + 1].iterator(CHUNK_SIZE)
+
+
+def stream_feed(cursor, limit, next_url):
+    """Куски JSON-документа {"results": [...], "next": ...}."""
+    yield '{"results": ['
+    last = None
+    for index, row in enumerate(get_feed_rows(cursor, limit)):
+        if index == limit:
+            cursor = encode_cursor(*last)
+            yield f'], "next": {json.dumps(next_url(cursor))}}}'
+            return
+        last = row['date'], row['id']
+        row['date'] = row['date'].isoformat()
+        row['url'] = reverse('news:detail', args=(row['id'],))
+        yield (', ' if index else '') + json.dumps(row, ensure_ascii=False)
+    yield '], "next": null}'
@@ -1,7 +1,20 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+
+from yanews.sqlite import apply_pragmas
 
 
 class NewsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'news'
     verbose_name = 'Новости'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        connection_created.connect(apply_pragmas)
+        # Модели auth нельзя импортировать до готовности реестра.
+        from yanews.auth import connect_receivers
+        connect_receivers()
+        from .forms import profanity_filter
+        # Собираем автомат при старте, а не на первом комментарии.
+        profanity_filter.matcher
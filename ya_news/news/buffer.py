@@ -0,0 +1,120 @@
+"""Буфер записи комментариев.
+
+При включённой настройке COMMENT_WRITE_BUFFER принятые комментарии не
+пишутся по одному, а копятся в памяти процесса и сохраняются одной
+транзакцией bulk_create: по таймеру раз в COMMENT_BUFFER_INTERVAL секунд
+или сразу, когда их набралось COMMENT_BUFFER_SIZE. Автор видит свой
+комментарий сразу после редиректа: страница новости с его ещё не
+сохранёнными комментариями сначала сбрасывает буфер. Буфер живёт в
+процессе, поэтому при нескольких процессах это работает, если запросы
+пользователя попадают в один процесс; иначе комментарий появится не
+позже чем через интервал таймера.
+
+Если пачка не записалась, комментарии пишутся по одному: нарушившие
+целостность (новость или автор уже удалены) отбрасываются с записью в
+лог, а остальные ошибки БД, например «database is locked», возвращают
+комментарий в буфер до следующей попытки.
+"""
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, connection
+
+from .transfer import add_comments
+
+logger = logging.getLogger(__name__)
+
+
+class CommentBuffer:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = []
+        self._timer = None
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, comment):
+        with self._lock:
+            self._pending.append(comment)
+            full = len(self._pending) >= settings.COMMENT_BUFFER_SIZE
+            if not full:
+                self._schedule()
+        if full:
+            self.flush()
+
+    def _schedule(self):
+        """Запускает таймер сброса; вызывается под self._lock."""
+        if self._timer is None:
+            self._timer = threading.Timer(
+                settings.COMMENT_BUFFER_INTERVAL, self._flush_on_timer
+            )
+            self._timer.daemon = True
+            self._timer.start()
+
+    def has_pending(self, author_id, news_id):
+        with self._lock:
+            return any(
+                comment.author_id == author_id and comment.news_id == news_id
+                for comment in self._pending
+            )
+
+    def flush(self):
+        """Сохраняет накопленные комментарии; возвращает число записанных."""
+        # Пачки пишутся по очереди, чтобы не спорить за запись в SQLite.
+        with self._flush_lock:
+            with self._lock:
+                comments, self._pending = self._pending, []
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            if not comments:
+                return 0
+            try:
+                add_comments(comments)
+                return len(comments)
+            except DatabaseError:
+                logger.exception(
+                    'Не удалось сохранить пачку из %d комментариев, '
+                    'пишем по одному', len(comments)
+                )
+            return self._save_one_by_one(comments)
+
+    def _save_one_by_one(self, comments):
+        saved, retry = 0, []
+        for comment in comments:
+            try:
+                add_comments([comment])
+                saved += 1
+            except IntegrityError:
+                logger.exception(
+                    'Комментарий автора %s к новости %s отброшен',
+                    comment.author_id, comment.news_id
+                )
+            except DatabaseError:
+                retry.append(comment)
+        if retry:
+            logger.error(
+                'Комментариев возвращено в буфер: %d', len(retry)
+            )
+            with self._lock:
+                self._pending[:0] = retry
+                self._schedule()
+        return saved
+
+    def _flush_on_timer(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('Сброс буфера комментариев по таймеру упал')
+        finally:
+            # Поток таймера не обслуживает запросы, соединение закрываем сами.
+            connection.close()
+
+
+comment_buffer = CommentBuffer()
+atexit.register(comment_buffer.flush)
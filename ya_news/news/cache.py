@@ -0,0 +1,162 @@
+"""Кеширование страниц YaNews.
+
+Анонимным пользователям главная и страница новости отдаются из кеша
+целиком, для остальных кешируются отрендеренные строки комментариев, а
+ссылки на редактирование и удаление дорисовываются в шаблоне. Ключи
+содержат версию, которую сигналы меняют при изменении новостей и
+комментариев, так что устаревшие записи просто перестают читаться.
+"""
+import time
+from collections import namedtuple
+from datetime import datetime
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.http import HttpResponse
+from django.template.loader import get_template
+from django.utils import timezone
+from django.utils.safestring import mark_safe
+
+from .models import Comment, News
+from .pagination import encode_cursor, get_comments_page
+
+HOME_VERSION_KEY = 'news:home:version'
+FEED_VERSION_KEY = 'news:feed:version'
+NEWS_VERSION_KEY = 'news:{pk}:version'
+
+CommentRow = namedtuple('CommentRow', ('pk', 'author_id', 'html'))
+
+
+def get_cache():
+    return caches[settings.NEWS_CACHE_ALIAS]
+
+
+def get_version(key):
+    cache = get_cache()
+    version = cache.get(key)
+    if version is None:
+        # Версия с меткой времени не совпадёт с версиями записей,
+        # оставшихся в кеше после вытеснения ключа версии.
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_versions(*keys):
+    # Новая метка времени вместо incr(): файловый кеш увеличивает счётчик
+    # неатомарно, и два процесса могли бы записать одну и ту же версию.
+    get_cache().set_many(dict.fromkeys(keys, time.time_ns()), None)
+
+
+def invalidate(*keys):
+    """Сбрасываем версии сразу и ещё раз после фиксации транзакции.
+
+    Повторный сброс не даёт параллельному запросу закешировать данные,
+    прочитанные до фиксации.
+    """
+    bump_versions(*keys)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: bump_versions(*keys))
+
+
+def invalidate_news(news_id, home=True, feed=False):
+    keys = [NEWS_VERSION_KEY.format(pk=news_id)]
+    if home:
+        keys.append(HOME_VERSION_KEY)
+    if feed:
+        keys.append(FEED_VERSION_KEY)
+    invalidate(*keys)
+
+
+def home_page_key():
+    return f'news:home:v{get_version(HOME_VERSION_KEY)}:page'
+
+
+def news_page_key(news_id):
+    version = get_version(NEWS_VERSION_KEY.format(pk=news_id))
+    return f'news:{news_id}:v{version}:page'
+
+
+def get_news_state(news_id):
+    """Версия новости и время её последнего изменения или None.
+
+    Время берётся из даты новости и последнего комментария, который
+    находится по индексу (news, created, id), и запоминается вместе с
+    версией, поэтому повторные проверки обходятся без запросов к БД.
+    """
+    version = get_version(NEWS_VERSION_KEY.format(pk=news_id))
+    key = f'news:{news_id}:v{version}:modified'
+    cache = get_cache()
+    last_modified = cache.get(key)
+    if last_modified is None:
+        last_comment = Comment.objects.filter(
+            news=OuterRef('pk')
+        ).order_by('-created').values('created')[:1]
+        row = News.objects.filter(pk=news_id).annotate(
+            last_comment=Subquery(last_comment)
+        ).values_list('date', 'last_comment').first()
+        if row is None:
+            return None
+        date, last_comment = row
+        last_modified = timezone.make_aware(
+            datetime.combine(date, datetime.min.time())
+        )
+        if last_comment is not None:
+            last_modified = max(last_modified, last_comment)
+        cache.set(key, last_modified, settings.NEWS_CACHE_TIMEOUT)
+    return version, last_modified
+
+
+def get_cached_comments_page(news_id, cursor=None):
+    """Страница комментариев в виде заранее отрендеренных строк."""
+    version = get_version(NEWS_VERSION_KEY.format(pk=news_id))
+    after = 'first' if cursor is None else encode_cursor(*cursor)
+    key = f'news:{news_id}:v{version}:comments:{after}'
+    cache = get_cache()
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+    comments, next_cursor = get_comments_page(news_id, cursor)
+    template = get_template('news/comment.html')
+    rows = [
+        CommentRow(
+            comment.pk,
+            comment.author_id,
+            mark_safe(template.render({'comment': comment})),
+        )
+        for comment in comments
+    ]
+    cache.set(key, (rows, next_cursor), settings.NEWS_CACHE_TIMEOUT)
+    return rows, next_cursor
+
+
+class AnonymousPageCacheMixin:
+    """Отдаёт страницу анонимным пользователям из кеша."""
+
+    page_version_key = HOME_VERSION_KEY
+
+    def get_page_cache_key(self):
+        """Ключ по адресу страницы и версии page_version_key."""
+        version = get_version(self.page_version_key)
+        path = md5(self.request.get_full_path().encode()).hexdigest()
+        return f'news:page:v{version}:{path}'
+
+    def get(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return super().get(request, *args, **kwargs)
+        cache = get_cache()
+        key = self.get_page_cache_key()
+        content = cache.get(key)
+        if content is not None:
+            return HttpResponse(content)
+        response = super().get(request, *args, **kwargs)
+
+        def store(response):
+            if response.status_code == 200:
+                cache.set(key, response.content, settings.NEWS_CACHE_TIMEOUT)
+
+        response.add_post_render_callback(store)
+        return response
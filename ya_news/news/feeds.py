@@ -0,0 +1,95 @@
+"""RSS- и Atom-ленты последних новостей.
+
+Документ ленты рендерится один раз на версию FEED_VERSION_KEY, которую
+сбрасывают сигналы News и импорт. Между публикациями ответ, включая
+проверку If-None-Match и If-Modified-Since, обходится без запросов к БД.
+"""
+import time
+from datetime import datetime
+from hashlib import md5
+
+from django.conf import settings
+from django.contrib.sites.shortcuts import get_current_site
+from django.contrib.syndication.views import Feed
+from django.http import HttpResponse
+from django.urls import reverse, reverse_lazy
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.feedgenerator import Atom1Feed
+from django.utils.http import http_date
+
+from .cache import FEED_VERSION_KEY, get_cache, get_version
+from .models import News
+
+
+class LatestNewsFeed(Feed):
+    title = 'YaNews'
+    link = reverse_lazy('news:home')
+    description = 'Последние новости YaNews'
+
+    def items(self):
+        return News.objects.order_by('-date', 'id').only(
+            'id', 'title', 'summary', 'date'
+        )[:settings.NEWS_FEED_SIZE]
+
+    def item_title(self, item):
+        return item.title
+
+    def item_description(self, item):
+        return item.summary
+
+    def item_link(self, item):
+        return reverse('news:detail', args=(item.pk,))
+
+    def item_pubdate(self, item):
+        return timezone.make_aware(
+            datetime.combine(item.date, datetime.min.time())
+        )
+
+
+class LatestNewsAtomFeed(LatestNewsFeed):
+    feed_type = Atom1Feed
+    subtitle = LatestNewsFeed.description
+
+
+def cached_feed(feed):
+    """Представление, которое отдаёт заранее отрендеренную ленту.
+
+    Last-Modified — время рендеринга: даты новостей точны лишь до дня и
+    не отличили бы две публикации за один день. Ссылки в ленте
+    абсолютные, поэтому документ хранится для каждого сайта и, как и
+    страницы, с конечным сроком: без django.contrib.sites сайт — это
+    заголовок Host запроса.
+    """
+    feed_name = type(feed).__name__
+
+    def view(request):
+        version = get_version(FEED_VERSION_KEY)
+        domain = get_current_site(request).domain
+        key = f'news:feed:v{version}:{feed_name}:{domain}'
+        cache = get_cache()
+        cached = cache.get(key)
+        if cached is None:
+            response = feed(request)
+            cached = (
+                response.content,
+                response['Content-Type'],
+                f'"{md5(response.content).hexdigest()}"',
+                int(time.time()),
+            )
+            cache.set(key, cached, settings.NEWS_CACHE_TIMEOUT)
+        content, content_type, etag, last_modified = cached
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = HttpResponse(content, content_type=content_type)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    return view
+
+
+rss_feed = cached_feed(LatestNewsFeed())
+atom_feed = cached_feed(LatestNewsAtomFeed())
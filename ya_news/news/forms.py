@@ -1,7 +1,9 @@
+from django import forms
 from django.forms import ModelForm
 from django.core.exceptions import ValidationError
 
 from .models import Comment
+from .profanity import BadWords
 
 BAD_WORDS = (
     'редиска',
@@ -9,6 +11,9 @@ BAD_WORDS = (
     # Дополните список на своё усмотрение.
 )
 WARNING = 'Не ругайтесь!'
+THROTTLED = 'Слишком много комментариев, попробуйте чуть позже.'
+
+profanity_filter = BadWords(BAD_WORDS)
 
 
 class CommentForm(ModelForm):
@@ -20,8 +25,22 @@ class CommentForm(ModelForm):
     def clean_text(self):
         """Не позволяем ругаться в комментариях."""
         text = self.cleaned_data['text']
-        lowered_text = text.lower()
-        for word in BAD_WORDS:
-            if word in lowered_text:
-                raise ValidationError(WARNING)
+        if profanity_filter.search(text):
+            raise ValidationError(WARNING)
         return text
+
+
+class SearchForm(forms.Form):
+    q = forms.CharField(label='Запрос', max_length=200, required=False)
+    date_from = forms.DateField(label='С даты', required=False)
+    date_to = forms.DateField(label='По дату', required=False)
+    # Смещение (page - 1) * size уходит в SQL и не должно переполниться.
+    page = forms.IntegerField(min_value=1, max_value=10_000, required=False)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        date_from = cleaned_data.get('date_from')
+        date_to = cleaned_data.get('date_to')
+        if date_from and date_to and date_from > date_to:
+            raise ValidationError('Начальная дата позже конечной.')
+        return cleaned_data
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand
+
+from news.transfer import (
+    EXPORTERS, FORMATS, Progress, RecordWriter, guess_format
+)
+
+
+class Command(BaseCommand):
+    help = 'Потоково выгружает новости или комментарии в JSONL/CSV.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default='-', help='Файл или - для stdout.'
+        )
+        parser.add_argument('--format', choices=FORMATS)
+        parser.add_argument(
+            '--model', choices=tuple(EXPORTERS), default='news'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        batch_size = options['batch_size']
+        export, fields = EXPORTERS[options['model']]
+        to_stdout = path == '-'
+        # Прогресс не должен смешиваться с данными в stdout.
+        progress = Progress(
+            self.stderr.write if to_stdout else self.stdout.write
+        )
+        file = (
+            self.stdout if to_stdout
+            else open(path, 'w', encoding='utf-8', newline='')
+        )
+        try:
+            writer = RecordWriter(
+                file, guess_format(path, options['format']), fields
+            )
+            written = 0
+            for record in export(batch_size):
+                writer.write(record)
+                written += 1
+                if written == batch_size:
+                    progress.add(written)
+                    written = 0
+            progress.add(written)
+        finally:
+            if not to_stdout:
+                file.close()
+        if not to_stdout:
+            self.stdout.write(self.style.SUCCESS(
+                f'Выгружено {progress.total} строк '
+                f'({progress.rate:.0f} строк/с).'
+            ))
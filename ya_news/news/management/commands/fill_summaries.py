@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from news.models import News
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает краткое содержание всех новостей.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        updated = News.objects.fill_summaries(options['batch_size'])
+        self.stdout.write(f'Обновлено новостей: {updated}')
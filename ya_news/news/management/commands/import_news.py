@@ -0,0 +1,50 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from news.transfer import (
+    FORMATS, IMPORTERS, Progress, batched, guess_format, read_records
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково загружает новости или комментарии из JSONL/CSV. '
+        'Новости с уже известным external_id обновляются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл или - для stdin.')
+        parser.add_argument('--format', choices=FORMATS)
+        parser.add_argument(
+            '--model', choices=tuple(IMPORTERS), default='news'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = guess_format(path, options['format'])
+        import_batch = IMPORTERS[options['model']]
+        progress = Progress(self.stdout.write)
+        skipped = 0
+        file = (
+            sys.stdin if path == '-'
+            else open(path, encoding='utf-8', newline='')
+        )
+        try:
+            records = read_records(file, fmt)
+            for batch in batched(records, options['batch_size']):
+                imported, batch_skipped = import_batch(batch)
+                skipped += batch_skipped
+                progress.add(imported)
+        except (KeyError, ValueError) as error:
+            raise CommandError(
+                f'Ошибка после {progress.total} строк: {error!r}'
+            ) from error
+        finally:
+            if file is not sys.stdin:
+                file.close()
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено {progress.total} строк ({progress.rate:.0f} строк/с),'
+            f' пропущено {skipped}.'
+        ))
@@ -0,0 +1,68 @@
+from django.db import migrations
+from django.db.utils import OperationalError
+
+# Индексы FTS5 с внешним содержимым и триггеры, которые держат их в
+# актуальном состоянии при любых INSERT, UPDATE и DELETE.
+INDEXES = (
+    ('news_news_search', 'news_news', ('title', 'text')),
+    ('news_comment_search', 'news_comment', ('text',)),
+)
+
+
+def index_sql(index, table, columns):
+    names = ', '.join(columns)
+    new = ', '.join(f'new.{column}' for column in columns)
+    old = ', '.join(f'old.{column}' for column in columns)
+    delete = (
+        f"INSERT INTO {index} ({index}, rowid, {names}) "
+        f"VALUES ('delete', old.id, {old});"
+    )
+    insert = f'INSERT INTO {index} (rowid, {names}) VALUES (new.id, {new});'
+    return (
+        f'CREATE VIRTUAL TABLE {index} USING fts5('
+        f"{names}, content='{table}', content_rowid='id')",
+        f'CREATE TRIGGER {index}_ai AFTER INSERT ON {table} '
+        f'BEGIN {insert} END',
+        f'CREATE TRIGGER {index}_ad AFTER DELETE ON {table} '
+        f'BEGIN {delete} END',
+        # Счётчик комментариев и прочие поля индекс не трогают.
+        f'CREATE TRIGGER {index}_au AFTER UPDATE OF {names} ON {table} '
+        f'BEGIN {delete} {insert} END',
+        f"INSERT INTO {index} ({index}) VALUES ('rebuild')",
+    )
+
+
+def create_indexes(apps, schema_editor):
+    """Без FTS5 поиск работает по подстроке, см. news.search."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        schema_editor.execute(
+            'CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(text)'
+        )
+        schema_editor.execute('DROP TABLE temp.fts5_probe')
+    except OperationalError:
+        return
+    for index in INDEXES:
+        for sql in index_sql(*index):
+            schema_editor.execute(sql)
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for index, _, _ in INDEXES:
+        for trigger in ('ai', 'ad', 'au'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {index}_{trigger}')
+        schema_editor.execute(f'DROP TABLE IF EXISTS {index}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0004_news_external_id'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
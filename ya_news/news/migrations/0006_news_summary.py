@@ -0,0 +1,46 @@
+from importlib import import_module
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils.text import Truncator
+
+# SQLite добавляет столбец через пересоздание таблицы news_news, и её
+# триггеры полнотекстового индекса пропадают: индекс строим заново.
+search_index = import_module('news.migrations.0005_search_index')
+BATCH_SIZE = 1000
+
+
+def fill_summaries(apps, schema_editor):
+    News = apps.get_model('news', 'News')
+    batch = []
+    for news in News.objects.only('id', 'text').iterator(BATCH_SIZE):
+        news.summary = Truncator(news.text).words(
+            settings.NEWS_SUMMARY_WORDS, truncate=' …'
+        )
+        batch.append(news)
+        if len(batch) == BATCH_SIZE:
+            News.objects.bulk_update(batch, ('summary',))
+            batch = []
+    News.objects.bulk_update(batch, ('summary',))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0005_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            search_index.drop_indexes, search_index.create_indexes
+        ),
+        migrations.AddField(
+            model_name='news',
+            name='summary',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(fill_summaries, migrations.RunPython.noop),
+        migrations.RunPython(
+            search_index.create_indexes, search_index.drop_indexes
+        ),
+    ]
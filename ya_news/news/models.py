@@ -1,22 +1,86 @@
 from datetime import datetime
 
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils.text import Truncator
+
+
+def make_summary(text):
+    """Начало текста для списков, как у фильтра truncatewords."""
+    return Truncator(text).words(settings.NEWS_SUMMARY_WORDS, truncate=' …')
+
+
+class NewsQuerySet(models.QuerySet):
+
+    def shift_comment_count(self, delta):
+        """Атомарно сдвигаем счётчик комментариев на delta."""
+        return self.update(comment_count=F('comment_count') + delta)
+
+    def recount_comments(self):
+        """Пересчитываем счётчики комментариев одним UPDATE."""
+        counts = Comment.objects.filter(
+            news=OuterRef('pk')
+        ).order_by().values('news').annotate(
+            total=Count('pk')
+        ).values('total')
+        return self.update(
+            comment_count=Coalesce(Subquery(counts), 0)
+        )
+
+    def fill_summaries(self, batch_size=1000):
+        """Пересчитываем краткое содержание пачками, не держа все тексты."""
+        batch = []
+        total = 0
+        # Порядок по первичному ключу: без сортировки всех текстов, которую
+        # дала бы сортировка модели по дате.
+        news_list = self.only('id', 'text').order_by('pk')
+        for news in news_list.iterator(batch_size):
+            news.summary = make_summary(news.text)
+            batch.append(news)
+            if len(batch) == batch_size:
+                self.model.objects.bulk_update(batch, ('summary',))
+                total += len(batch)
+                batch = []
+        self.model.objects.bulk_update(batch, ('summary',))
+        return total + len(batch)
 
 
 class News(models.Model):
     title = models.CharField(max_length=50)
     text = models.TextField()
+    summary = models.TextField(blank=True, editable=False)
     date = models.DateField(default=datetime.today)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    external_id = models.CharField(
+        max_length=100, unique=True, null=True, blank=True
+    )
+
+    objects = NewsQuerySet.as_manager()
 
     class Meta:
         ordering = ('-date',)
+        indexes = (
+            models.Index(fields=('-date', 'id'), name='news_date_id_idx'),
+        )
         verbose_name_plural = 'Новости'
         verbose_name = 'Новость'
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        """Краткое содержание пересчитывается вместе с текстом."""
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            if 'text' not in self.get_deferred_fields():
+                self.summary = make_summary(self.text)
+        elif 'text' in update_fields:
+            self.summary = make_summary(self.text)
+            kwargs['update_fields'] = {*update_fields, 'summary'}
+        super().save(*args, **kwargs)
+
 
 class Comment(models.Model):
     news = models.ForeignKey(
@@ -32,6 +96,29 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ('created',)
+        indexes = (
+            models.Index(
+                fields=('news', 'created', 'id'),
+                name='comment_news_created_id_idx'
+            ),
+            models.Index(
+                fields=('author', 'id'), name='comment_author_id_idx'
+            ),
+        )
 
     def __str__(self):
         return self.text[:50]
+
+    def save(self, *args, **kwargs):
+        """Новый комментарий увеличивает счётчик у новости."""
+        if not self._state.adding:
+            return super().save(*args, **kwargs)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            News.objects.filter(pk=self.news_id).shift_comment_count(1)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            News.objects.filter(pk=self.news_id).shift_comment_count(-1)
+        return result
@@ -0,0 +1,56 @@
+"""Keyset-пагинация комментариев по ключу (created, id).
+
+Каждая следующая страница ищется по индексу от последнего показанного
+комментария, поэтому её стоимость не зависит от глубины ветки.
+"""
+import base64
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import Q
+
+from .models import Comment
+
+# Больше не помещается в целое SQLite: при привязке к запросу такой id
+# дал бы OverflowError вместо ответа 404.
+MAX_PK = 2 ** 63 - 1
+
+
+def encode_cursor(created, pk):
+    """Курсор указывает на последний комментарий страницы."""
+    raw = f'{created.isoformat()}|{pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Возвращает пару (created, id) или None для испорченного курсора."""
+    try:
+        created, pk = base64.urlsafe_b64decode(
+            cursor.encode()
+        ).decode().split('|')
+        created, pk = datetime.fromisoformat(created), int(pk)
+    except ValueError:
+        return None
+    if not 0 <= pk <= MAX_PK:
+        return None
+    return created, pk
+
+
+def get_comments_page(news_id, cursor=None, size=None):
+    """Страница комментариев после курсора и курсор следующей страницы."""
+    size = size or settings.COMMENTS_COUNT_ON_PAGE
+    comments = Comment.objects.filter(
+        news_id=news_id
+    ).select_related('author').order_by('created', 'id')
+    if cursor is not None:
+        created, pk = cursor
+        # created__gte ограничивает диапазон индекса, а OR лишь отсекает
+        # комментарии с тем же created, уже показанные на прошлой странице.
+        comments = comments.filter(
+            Q(created__gte=created) & (Q(created__gt=created) | Q(pk__gt=pk))
+        )
+    page = list(comments[:size + 1])
+    if len(page) > size:
+        last = page[size - 1]
+        return page[:size], encode_cursor(last.created, last.pk)
+    return page, None
@@ -0,0 +1,112 @@
+"""Поиск запрещённых слов алгоритмом Ахо — Корасик.
+
+Автомат строится по словарю один раз и проверяет текст за один проход,
+поэтому время проверки почти не зависит от размера словаря.
+"""
+import os
+import threading
+from collections import deque
+
+from django.conf import settings
+
+
+def normalize(text):
+    """Приводим регистр и не различаем «ё» и «е»."""
+    return text.casefold().replace('ё', 'е')
+
+
+class Matcher:
+    """Автомат Ахо — Корасик для поиска подстрок из словаря."""
+
+    def __init__(self, words):
+        self.goto = [{}]
+        self.fail = [0]
+        self.terminal = [False]
+        for word in words:
+            word = normalize(word.strip())
+            if word:
+                self._add(word)
+        self._link()
+
+    def _add(self, word):
+        state = 0
+        for char in word:
+            next_state = self.goto[state].get(char)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto.append({})
+                self.fail.append(0)
+                self.terminal.append(False)
+                self.goto[state][char] = next_state
+            state = next_state
+        self.terminal[state] = True
+
+    def _link(self):
+        """Строим суффиксные ссылки обходом бора в ширину."""
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                if self.terminal[self.fail[next_state]]:
+                    self.terminal[next_state] = True
+
+    def search(self, text):
+        """Есть ли в тексте хотя бы одно слово из словаря."""
+        goto, fail, terminal = self.goto, self.fail, self.terminal
+        state = 0
+        for char in normalize(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if terminal[state]:
+                return True
+        return False
+
+
+class BadWords:
+    """Словарь запрещённых слов с автоматом, собранным один раз.
+
+    Кроме встроенных слов читает файл из настройки BAD_WORDS_FILE (по
+    слову в строке) и пересобирает автомат, когда файл меняется, так что
+    словарь обновляется без перезапуска.
+    """
+
+    def __init__(self, words):
+        self.words = tuple(words)
+        self._lock = threading.Lock()
+        self._matcher = None
+        self._source = None
+
+    def _current_source(self):
+        path = getattr(settings, 'BAD_WORDS_FILE', None)
+        if not path:
+            return None
+        try:
+            return path, os.stat(path).st_mtime_ns
+        except OSError:
+            return path, None
+
+    def _load(self, source):
+        words = list(self.words)
+        if source is not None and source[1] is not None:
+            with open(source[0], encoding='utf-8') as file:
+                words.extend(file)
+        return Matcher(words)
+
+    @property
+    def matcher(self):
+        source = self._current_source()
+        if self._matcher is None or source != self._source:
+            with self._lock:
+                if self._matcher is None or source != self._source:
+                    self._matcher = self._load(source)
+                    self._source = source
+        return self._matcher
+
+    def search(self, text):
+        return self.matcher.search(text)
@@ -3,6 +3,7 @@ from datetime import datetime, timedelta
 import pytest
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import Client
 from django.urls import reverse
 from django.utils import timezone
@@ -14,6 +15,52 @@ User = get_user_model()
 
 TEXT_COMMENT = 'Comment text...'
 NEW_COMMENT_TEXT = 'New comment text...'
+SEEDED_USERNAMES = ('author', 'reader')
+SEEDED_NEWS_TITLE = 'Title'
+
+
+def seed():
+    """Пользователи, лента новостей и новость с комментариями."""
+    User.objects.bulk_create(
+        (User(username=username) for username in SEEDED_USERNAMES),
+        ignore_conflicts=True
+    )
+    today = datetime.today()
+    # Лента старше новости из фикстуры news, та всегда первая на главной.
+    News.objects.bulk_create(
+        News(
+            title=f'News Title {index}',
+            text='Long long long text :-)',
+            date=today - timedelta(days=index + 1)
+        )
+        for index in range(settings.NEWS_COUNT_ON_HOME_PAGE + 1)
+    )
+    news = News.objects.create(title=SEEDED_NEWS_TITLE, text='Text')
+    now = timezone.now()
+    texts = [f'Tекст {index}' for index in range(10)]
+    Comment.objects.bulk_create(
+        Comment(news=news, author=User.objects.get(username='author'),
+                text=text)
+        for text in texts
+    )
+    # SQLite не возвращает id из bulk_create, а auto_now_add перезаписывает
+    # created при вставке: выставляем даты отдельным запросом.
+    comments = list(Comment.objects.filter(news=news).order_by('pk'))
+    for index, comment in enumerate(comments):
+        comment.created = now + timedelta(days=index)
+    Comment.objects.bulk_update(comments, ('created',))
+    News.objects.filter(pk=news.pk).shift_comment_count(len(comments))
+
+
+@pytest.fixture(scope='session')
+def django_db_setup(django_db_setup, django_db_blocker):
+    """Общие для всех тестов данные создаются один раз на процесс.
+
+    Каждый тест работает в транзакции, которая откатывается, поэтому
+    данные сессии переживают тест без изменений.
+    """
+    with django_db_blocker.unblock():
+        seed()
 
 
 @pytest.fixture(autouse=True)
@@ -21,23 +68,29 @@ def enable_db_access(db):
     pass
 
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
+
+def seeded_news():
+    # Транзакционные тесты очищают базу, после них данные создаются заново.
+    news = News.objects.filter(title=SEEDED_NEWS_TITLE).first()
+    if news is None:
+        seed()
+        news = News.objects.get(title=SEEDED_NEWS_TITLE)
+    return news
+
+
 @pytest.fixture
 def news():
-    return News.objects.create(title='Title', text='Text')
+    """Новость с комментариями из comments, создана один раз за сессию."""
+    return seeded_news()
 
 
 @pytest.fixture
-def news_list():
-    today = datetime.today()
-    all_news = [
-        News(
-            title=f'News Title {index}',
-            text='Long long long text :-)',
-            date=today - timedelta(days=index)
-        )
-        for index in range(settings.NEWS_COUNT_ON_HOME_PAGE + 1)
-    ]
-    News.objects.bulk_create(all_news)
+def news_list(news):
+    return list(News.objects.exclude(pk=news.pk))
 
 
 @pytest.fixture
@@ -45,6 +98,16 @@ def home_url():
     return reverse('news:home')
 
 
+@pytest.fixture
+def api_news_url():
+    return reverse('news:api_news')
+
+
+@pytest.fixture
+def search_url():
+    return reverse('news:search')
+
+
 @pytest.fixture
 def login_url():
     return reverse('users:login')
@@ -55,6 +118,11 @@ def detail_url(news):
     return reverse('news:detail', args=(news.id,))
 
 
+@pytest.fixture
+def comments_url(news):
+    return reverse('news:comments', args=(news.id,))
+
+
 @pytest.fixture
 def edit_url(comment):
     return reverse('news:edit', args=(comment.id,))
@@ -66,11 +134,13 @@ def delete_url(comment):
 
 
 @pytest.fixture
-def public_urls(home_url, detail_url, login_url):
+def public_urls(home_url, detail_url, comments_url, login_url, search_url):
     return (
         home_url,
         detail_url,
+        comments_url,
         login_url,
+        search_url,
         reverse('users:logout'),
         reverse('users:signup'),
     )
@@ -81,9 +151,15 @@ def private_urls(edit_url, delete_url):
     return (edit_url, delete_url)
 
 
+def seeded_user(username):
+    # Транзакционные тесты очищают базу, после них пользователь создаётся
+    # заново.
+    return User.objects.get_or_create(username=username)[0]
+
+
 @pytest.fixture
 def author():
-    return User.objects.create(username='author')
+    return seeded_user('author')
 
 
 @pytest.fixture
@@ -95,7 +171,7 @@ def author_client(author):
 
 @pytest.fixture
 def reader():
-    return User.objects.create(username='reader')
+    return seeded_user('reader')
 
 
 @pytest.fixture
@@ -115,16 +191,8 @@ def comment(news, author):
 
 
 @pytest.fixture
-def comments(news, author):
-    now = timezone.now()
-    comments = []
-    for index in range(10):
-        comment = Comment.objects.create(
-            news=news, author=author, text=f'Tекст {index}',
-        )
-        comment.created = now + timedelta(days=index)
-        comment.save()
-        comments.append(comment)
+def comments(news):
+    return list(news.comment_set.order_by('created'))
 
 
 @pytest.fixture
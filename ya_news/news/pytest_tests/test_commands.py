@@ -0,0 +1,89 @@
+import csv
+import json
+from io import StringIO
+
+from django.core.management import call_command
+
+from news.models import News
+
+
+def write_jsonl(path, records):
+    path.write_text(
+        ''.join(json.dumps(record) + '\n' for record in records),
+        encoding='utf-8'
+    )
+
+
+def test_import_news_upserts_by_external_id(tmp_path):
+    source = tmp_path / 'news.jsonl'
+    write_jsonl(source, [
+        {'external_id': f'feed-{index}', 'title': f'Title {index}',
+         'text': 'Text', 'date': '2024-01-0{}'.format(index + 1)}
+        for index in range(3)
+    ])
+    call_command('import_news', source, batch_size=2, stdout=StringIO())
+    write_jsonl(source, [
+        {'external_id': 'feed-1', 'title': 'Updated', 'text': 'New text'},
+    ])
+    out = StringIO()
+    call_command('import_news', source, stdout=out)
+    assert News.objects.filter(external_id__startswith='feed-').count() == 3
+    updated = News.objects.get(external_id='feed-1')
+    assert (updated.title, updated.summary) == ('Updated', 'New text')
+    assert updated.date.isoformat() == '2024-01-02'
+    assert 'Загружено 1 строк' in out.getvalue()
+
+
+def test_import_news_counts_duplicates_as_skipped(tmp_path):
+    source = tmp_path / 'news.jsonl'
+    write_jsonl(source, [
+        {'external_id': 'feed-1', 'title': title, 'text': 'Text'}
+        for title in ('First', 'Second')
+    ])
+    out = StringIO()
+    call_command('import_news', source, stdout=out)
+    assert News.objects.get(external_id='feed-1').title == 'Second'
+    assert 'Загружено 1 строк' in out.getvalue()
+    assert 'пропущено 1.' in out.getvalue()
+
+
+def test_import_comments_updates_counters(tmp_path, news, author):
+    news.external_id = 'feed-1'
+    news.save()
+    source = tmp_path / 'comments.csv'
+    with open(source, 'w', encoding='utf-8', newline='') as file:
+        writer = csv.DictWriter(
+            file, fieldnames=('news_external_id', 'author', 'text')
+        )
+        writer.writeheader()
+        writer.writerow({
+            'news_external_id': 'feed-1', 'author': author.username,
+            'text': 'First',
+        })
+        writer.writerow({
+            'news_external_id': 'feed-1', 'author': 'nobody', 'text': 'Lost',
+        })
+    out = StringIO()
+    call_command('import_news', source, model='comment', stdout=out)
+    comment_count = news.comment_count
+    news.refresh_from_db()
+    assert news.comment_set.order_by('pk').last().text == 'First'
+    assert news.comment_count == comment_count + 1
+    assert 'пропущено 1' in out.getvalue()
+
+
+def test_export_news(tmp_path, news_list):
+    target = tmp_path / 'news.jsonl'
+    call_command('export_news', target, batch_size=4, stdout=StringIO())
+    records = [
+        json.loads(line)
+        for line in target.read_text(encoding='utf-8').splitlines()
+    ]
+    assert len(records) == News.objects.count()
+    assert set(records[0]) == {'external_id', 'title', 'text', 'date'}
+
+
+def test_fill_summaries(news_list):
+    assert News.objects.filter(summary='').exists()
+    call_command('fill_summaries', batch_size=4, stdout=StringIO())
+    assert not News.objects.filter(summary='').exists()
@@ -1,7 +1,26 @@
+import json
+from datetime import date, timedelta
+from http import HTTPStatus
+
 import pytest
+from asgiref.sync import async_to_sync
 from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.asgi import get_asgi_application
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
+from django.utils.text import Truncator
 
+from news import search as search_module
+from news import views
 from news.forms import CommentForm
+from news.models import Comment, News
+from news.pagination import MAX_PK, encode_cursor
+from yanews.metrics import view_stats
+from .conftest import NEW_COMMENT_TEXT, TEXT_COMMENT
 
 
 def test_news_count(client, home_url, news_list):
@@ -16,6 +35,25 @@ def test_news_order(client, home_url, news_list):
     assert all_dates == sorted_dates
 
 
+def test_home_page_does_not_load_comments(
+    client, home_url, comment, django_assert_num_queries
+):
+    with django_assert_num_queries(1):
+        response = client.get(home_url)
+    assert 'Комментариев: 1' in response.content.decode()
+
+
+def test_home_page_shows_stored_summary(client, home_url, news):
+    news.text = ' '.join(f'слово{index}' for index in range(100))
+    news.save(update_fields=('text',))
+    news.refresh_from_db()
+    assert news.summary == Truncator(news.text).words(15, truncate=' …')
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(home_url)
+    assert news.summary in response.content.decode()
+    assert not any('"text"' in query['sql'] for query in queries)
+
+
 def test_comments_order(client, detail_url, comments):
     response = client.get(detail_url)
     news = response.context['news']
@@ -25,6 +63,66 @@ def test_comments_order(client, detail_url, comments):
     assert all_timestamps == sorted_timestamps
 
 
+def test_comments_keyset_pagination(
+    client, settings, detail_url, comments_url, comments
+):
+    settings.COMMENTS_COUNT_ON_PAGE = 4
+    context = client.get(detail_url).context
+    pages = [context['comments']]
+    next_cursor = context['next_cursor']
+    while next_cursor:
+        context = client.get(comments_url, {'after': next_cursor}).context
+        pages.append(context['comments'])
+        next_cursor = context['next_cursor']
+    assert [len(page) for page in pages] == [4, 4, 2]
+    shown = [comment.pk for page in pages for comment in page]
+    assert shown == list(
+        Comment.objects.order_by('created', 'id').values_list('pk', flat=True)
+    )
+
+
+OVERSIZED_CURSOR = encode_cursor(timezone.now(), MAX_PK + 1)
+
+
+@pytest.mark.parametrize('cursor', ['broken', OVERSIZED_CURSOR])
+def test_comments_page_rejects_bad_cursor(client, comments_url, cursor):
+    response = client.get(comments_url, {'after': cursor})
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+def test_anonymous_pages_are_cached(
+    client, home_url, detail_url, comment, django_assert_num_queries
+):
+    for url in (home_url, detail_url):
+        client.get(url)
+        with django_assert_num_queries(0):
+            assert client.get(url).status_code == HTTPStatus.OK
+
+
+def test_cached_pages_are_invalidated(
+    client, author_client, home_url, detail_url, news, comment
+):
+    client.get(home_url)
+    client.get(detail_url)
+    author_client.post(detail_url, data={'text': NEW_COMMENT_TEXT})
+    assert NEW_COMMENT_TEXT in client.get(detail_url).content.decode()
+    news.title = 'Updated title'
+    news.save()
+    assert news.title in client.get(home_url).content.decode()
+
+
+def test_cached_comments_keep_personal_links(
+    author_client, reader_client, detail_url, edit_url,
+    django_assert_num_queries
+):
+    assert edit_url in author_client.get(detail_url).content.decode()
+    # Сессия, пользователь и новость: комментарии берутся из кеша.
+    with django_assert_num_queries(3):
+        response = reader_client.get(detail_url)
+    assert TEXT_COMMENT in response.content.decode()
+    assert edit_url not in response.content.decode()
+
+
 @pytest.mark.parametrize('user_fixture, expected_form', [
     ('author_client', True),
     ('client', False)
@@ -37,3 +135,193 @@ def test_comment_form_presence(
     assert ('form' in response.context) == expected_form
     if expected_form:
         assert isinstance(response.context['form'], CommentForm)
+
+
+@pytest.mark.skipif(
+    connection.vendor != 'sqlite', reason='EXPLAIN QUERY PLAN из SQLite'
+)
+@pytest.mark.parametrize('url_fixture', [
+    'home_url', 'detail_url', 'comments_url', 'edit_url', 'delete_url'
+])
+def test_views_use_indexes(author_client, comments, url_fixture, request):
+    url = request.getfixturevalue(url_fixture)
+    with CaptureQueriesContext(connection) as context:
+        author_client.get(url)
+    with connection.cursor() as cursor:
+        for query in context.captured_queries:
+            if not query['sql'].startswith('SELECT'):
+                continue
+            cursor.execute(f'EXPLAIN QUERY PLAN {query["sql"]}')
+            for *_, step in cursor.fetchall():
+                assert 'TEMP B-TREE' not in step, query['sql']
+                assert (
+                    not step.startswith('SCAN') or 'INDEX' in step
+                ), query['sql']
+
+
+def search(client, search_url, **params):
+    return client.get(search_url, params).context['results']
+
+
+def test_search_finds_news_and_comments(client, search_url, news, author):
+    other = News.objects.create(
+        title='Погода', text='Завтра будет солнечно и тепло',
+        date=date.today() - timedelta(days=3)
+    )
+    Comment.objects.create(news=news, author=author, text='Тепло, но ветер')
+    assert [row.pk for row in search(client, search_url, q='тепло')] == [
+        other.pk, news.pk
+    ]
+    assert [row.pk for row in search(
+        client, search_url, q='"будет солнечно"'
+    )] == [other.pk]
+    assert search(client, search_url, q='"солнечно будет"') == []
+    assert [row.pk for row in search(
+        client, search_url, q='тепло', date_from=date.today().isoformat()
+    )] == [news.pk]
+    assert [row.pk for row in search(
+        client, search_url, q='тепло', date_to=other.date.isoformat()
+    )] == [other.pk]
+
+
+def test_search_index_follows_changes(client, search_url, news):
+    News.objects.bulk_create([News(title='Импорт', text='Массовая загрузка')])
+    assert len(search(client, search_url, q='массовая')) == 1
+    news.text = 'Новый текст'
+    news.save()
+    assert len(search(client, search_url, q='новый')) == 1
+    news.delete()
+    assert search(client, search_url, q='новый') == []
+
+
+def test_search_snippet_is_highlighted_and_escaped(client, search_url):
+    if not search_module.use_fts():
+        pytest.skip('Подсветка доступна только в FTS5')
+    News.objects.create(title='Код', text='Тег <script> в тексте')
+    with CaptureQueriesContext(connection) as queries:
+        result, = search(client, search_url, q='тексте')
+    assert result.snippet == (
+        'Тег &lt;script&gt; в <mark>тексте</mark>'
+    )
+    assert not any('"text"' in query['sql'] for query in queries)
+
+
+def test_search_rejects_huge_page(client, search_url):
+    response = client.get(search_url, {'q': 'Text', 'page': str(2 ** 63)})
+    assert response.status_code == HTTPStatus.OK
+    assert 'page' in response.context['form'].errors
+    assert 'results' not in response.context
+
+
+def test_search_rejects_inverted_dates(client, search_url, news):
+    response = client.get(search_url, {
+        'q': 'Text', 'date_from': '2024-02-01', 'date_to': '2024-01-01'
+    })
+    assert response.context['form'].errors
+    assert 'results' not in response.context
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.parametrize('sync_view, async_view, with_pk', [
+    (views.NewsList.as_view(), views.news_list_async, False),
+    (views.NewsDetailView.as_view(), views.news_detail_async, True),
+])
+def test_async_views_match_sync_views(
+    rf, news, comment, sync_view, async_view, with_pk
+):
+    kwargs = {'pk': news.pk} if with_pk else {}
+    request = rf.get('/')
+    request.user = AnonymousUser()
+    expected = sync_view(request, **kwargs).render().content
+    cache.clear()
+    response = async_to_sync(async_view)(request, **kwargs)
+    assert response.status_code == HTTPStatus.OK
+    assert response.content == expected
+
+
+def asgi_get(path, query=''):
+    """GET через ASGI-приложение проекта; статус и тело ответа."""
+    status, body = None, []
+    request = {'type': 'http.request', 'body': b'', 'more_body': False}
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': 'GET', 'scheme': 'http', 'path': path,
+        'raw_path': path.encode(), 'query_string': query.encode(),
+        'root_path': '', 'headers': [(b'host', b'localhost')],
+        'client': ('127.0.0.1', 50000), 'server': ('localhost', 80),
+    }
+
+    async def receive():
+        return request
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+        else:
+            body.append(message.get('body', b''))
+
+    async_to_sync(get_asgi_application())(scope, receive, send)
+    return status, b''.join(body)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_json_feed_under_asgi(api_news_url, news_list):
+    status, body = asgi_get(api_news_url, 'limit=3')
+    assert status == HTTPStatus.OK
+    feed = json.loads(body)
+    assert len(feed['results']) == 3
+    assert feed['next']
+
+
+def read_feed(client, url, params=None):
+    response = client.get(url, params)
+    assert response.streaming
+    return json.loads(b''.join(response.streaming_content))
+
+
+def test_json_feed_pages(client, api_news_url, news_list, comment):
+    expected = list(
+        News.objects.order_by('-date', 'id').values_list('id', flat=True)
+    )
+    shown, url, params = [], api_news_url, {'limit': 4}
+    while url:
+        feed = read_feed(client, url, params)
+        assert len(feed['results']) <= 4
+        shown.extend(feed['results'])
+        url, params = feed['next'], None
+    assert [row['id'] for row in shown] == expected
+    counts = {row['id']: row['comment_count'] for row in shown}
+    assert counts[comment.news_id] == comment.news.comment_set.count()
+    assert shown[0]['url'] == reverse('news:detail', args=(shown[0]['id'],))
+
+
+@pytest.mark.parametrize('params', [
+    {'after': 'broken'}, {'after': OVERSIZED_CURSOR},
+    {'limit': '0'}, {'limit': 'many'}, {'limit': '²'},
+])
+def test_json_feed_rejects_bad_params(client, api_news_url, params):
+    assert client.get(api_news_url, params).status_code == HTTPStatus.NOT_FOUND
+
+
+def test_async_views_follow_setting(settings, home_url, detail_url):
+    settings.NEWS_ASYNC_VIEWS = True
+    assert resolve(home_url).func is views.news_list_async
+    assert resolve(detail_url).func is views.news_detail_async
+    settings.NEWS_ASYNC_VIEWS = False
+    assert resolve(home_url).func is not views.news_list_async
+
+
+@pytest.mark.django_db(transaction=True)
+def test_middlewares_under_asgi(settings, home_url, news_list):
+    settings.NEWS_ASYNC_VIEWS = True
+    settings.VIEW_METRICS = True
+    settings.TEMPLATE_PROFILING = True
+    settings.CACHED_AUTH = True
+    view_stats.reset()
+    status, body = asgi_get(home_url)
+    assert status == HTTPStatus.OK
+    assert b'News Title' in body
+    metrics = view_stats.snapshot()['news:home']
+    assert metrics['queries']['sum'] >= 1
+    assert metrics['template_ms']['sum'] > 0
@@ -1,11 +1,31 @@
+import os
 from http import HTTPStatus
+from io import StringIO
 from random import choice
+from unittest.mock import patch
 
 import pytest
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, OperationalError, connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 from pytest_django.asserts import assertFormError
 
-from news.forms import BAD_WORDS, WARNING
-from news.models import Comment
+from news import transfer
+from news.admin import MODERATED_TEXT
+from news.buffer import CommentBuffer, comment_buffer
+from news.cache import (
+    HOME_VERSION_KEY, NEWS_VERSION_KEY, AnonymousPageCacheMixin,
+    get_version, invalidate
+)
+from news.forms import BAD_WORDS, THROTTLED, WARNING, CommentForm
+from news.models import Comment, News
+from news.profanity import Matcher
+from news.throttle import take
+from yanews.auth import USER_KEY
+from yanews.sqlite import apply_pragmas
 from .conftest import TEXT_COMMENT, NEW_COMMENT_TEXT
 
 
@@ -34,18 +54,54 @@ def test_user_cant_use_bad_words(admin_client, detail_url):
     assertFormError(response, 'form', 'text', WARNING)
 
 
+def test_form_error_page_lists_comments(admin_client, detail_url, comments):
+    bad_words_data = {'text': f'Текст, {choice(BAD_WORDS)}, еще текст'}
+    response = admin_client.post(detail_url, data=bad_words_data)
+    content = response.content.decode()
+    assert all(comment.text in content for comment in comments)
+
+
+@pytest.mark.parametrize('text, is_valid', [
+    ('НЕГОДЯЙ!', False),
+    ('Ах ты нёгодяй', False),
+    ('Вот РеДиСкА', False),
+    ('Доброе слово', True),
+])
+def test_bad_words_are_case_and_yo_insensitive(text, is_valid):
+    assert CommentForm(data={'text': text}).is_valid() == is_valid
+
+
+def test_matcher_finds_overlapping_words():
+    matcher = Matcher(['he', 'she', 'his', 'hers'])
+    assert matcher.search('ushers')
+    assert matcher.search('ahis')
+    assert not matcher.search('h e s')
+
+
+def test_bad_words_reload_from_file(settings, tmp_path):
+    words_file = tmp_path / 'bad_words.txt'
+    words_file.write_text('бяка\n', encoding='utf-8')
+    settings.BAD_WORDS_FILE = str(words_file)
+    assert not CommentForm(data={'text': 'Ну и бяка'}).is_valid()
+    words_file.write_text('бука\n', encoding='utf-8')
+    stat = words_file.stat()
+    os.utime(words_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert CommentForm(data={'text': 'Ну и бяка'}).is_valid()
+    assert not CommentForm(data={'text': 'Ну и бука'}).is_valid()
+
+
 @pytest.mark.parametrize('user_fixture, expected_status, should_delete', [
     ('author_client', HTTPStatus.FOUND, False),
     ('reader_client', HTTPStatus.NOT_FOUND, True),
 ])
 def test_comment_deletion(
-    delete_url, url_to_comments, user_fixture,
+    comment, delete_url, url_to_comments, user_fixture,
     expected_status, should_delete, request
 ):
     user = request.getfixturevalue(user_fixture)
     response = user.delete(delete_url)
     assert response.status_code == expected_status
-    assert Comment.objects.count() == should_delete
+    assert Comment.objects.filter(pk=comment.pk).exists() == should_delete
     if not should_delete:
         assert response.url == url_to_comments
 
@@ -69,3 +125,205 @@ def test_comment_editing(
         assert touch_comment.text == NEW_COMMENT_TEXT
     else:
         assert touch_comment.text == TEXT_COMMENT
+
+
+def test_comment_count_is_maintained(
+    author_client, detail_url, delete_url, news
+):
+    news.refresh_from_db()
+    comment_count = news.comment_count
+    author_client.post(detail_url, data={'text': NEW_COMMENT_TEXT})
+    news.refresh_from_db()
+    assert news.comment_count == comment_count + 1
+    author_client.delete(delete_url)
+    news.refresh_from_db()
+    assert news.comment_count == comment_count
+
+
+def test_recount_comments_command(comments, news):
+    News.objects.update(comment_count=0)
+    call_command('recount_comments', stdout=StringIO())
+    news.refresh_from_db()
+    assert news.comment_count == Comment.objects.filter(news=news).count()
+
+
+@pytest.mark.parametrize('url_fixture, data, expected_queries', [
+    # Сессия, пользователь, новость, SAVEPOINT, INSERT, счётчик, RELEASE.
+    ('detail_url', {'text': NEW_COMMENT_TEXT}, 7),
+    # Сессия, пользователь, комментарий, UPDATE.
+    ('edit_url', {'text': NEW_COMMENT_TEXT}, 4),
+    # Сессия, пользователь, комментарий, SAVEPOINT, DELETE, счётчик, RELEASE.
+    ('delete_url', {}, 7),
+])
+def test_write_views_query_count(
+    author_client, url_fixture, data, expected_queries,
+    django_assert_num_queries, request
+):
+    url = request.getfixturevalue(url_fixture)
+    with django_assert_num_queries(expected_queries):
+        response = author_client.post(url, data=data)
+    assert response.status_code == HTTPStatus.FOUND
+
+
+def test_cached_auth_skips_session_and_user_queries(
+    settings, author, comment, edit_url, django_assert_num_queries
+):
+    settings.CACHED_AUTH = True
+    settings.SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+    client = Client()
+    client.force_login(author)
+    client.get(edit_url)
+    # Комментарий и UPDATE, сессия и пользователь берутся из кеша.
+    with django_assert_num_queries(2):
+        response = client.post(edit_url, data={'text': NEW_COMMENT_TEXT})
+    assert response.status_code == HTTPStatus.FOUND
+    client.logout()
+    response = client.post(edit_url, data={'text': TEXT_COMMENT})
+    assert response.url.startswith(str(settings.LOGIN_URL))
+    assert Comment.objects.get(pk=comment.pk).text == NEW_COMMENT_TEXT
+
+
+def test_password_change_evicts_cached_user(author):
+    cache.set(USER_KEY.format(pk=author.pk), author)
+    author.set_password('new-password')
+    author.save()
+    assert cache.get(USER_KEY.format(pk=author.pk)) is None
+
+
+def test_sqlite_pragmas_are_applied(settings):
+    if connection.vendor != 'sqlite':
+        pytest.skip('Прагмы есть только у SQLite')
+    settings.SQLITE_PRAGMAS = {'cache_size': -1234}
+    apply_pragmas(sender=None, connection=connection)
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA cache_size')
+        assert cursor.fetchone()[0] == -1234
+
+
+def test_comment_rate_limit_per_user(
+    settings, author_client, detail_url, comments
+):
+    settings.COMMENT_RATE_LIMITS = {'user': (2, 60), 'news': None}
+    responses = [
+        author_client.post(detail_url, data={'text': TEXT_COMMENT})
+        for _ in range(3)
+    ]
+    assert [response.status_code for response in responses] == [
+        HTTPStatus.FOUND, HTTPStatus.FOUND, HTTPStatus.TOO_MANY_REQUESTS
+    ]
+    assert Comment.objects.filter(text=TEXT_COMMENT).count() == 2
+    content = responses[-1].content.decode()
+    assert all(comment.text in content for comment in comments)
+
+
+def test_comment_rate_limit_per_news(
+    settings, author_client, reader_client, detail_url
+):
+    settings.COMMENT_RATE_LIMITS = {'news': (1, 60)}
+    author_client.post(detail_url, data={'text': TEXT_COMMENT})
+    response = reader_client.post(detail_url, data={'text': TEXT_COMMENT})
+    assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS
+    assertFormError(response, 'form', 'text', errors=THROTTLED)
+
+
+def test_token_bucket_refills():
+    bucket = [('test:bucket', (1, 10))]
+    assert take(bucket, now=0)
+    assert not take(bucket, now=5)
+    assert take(bucket, now=10)
+
+
+def test_buffered_comment_is_visible_to_author(
+    settings, author_client, detail_url, news
+):
+    settings.COMMENT_WRITE_BUFFER = True
+    settings.COMMENT_BUFFER_INTERVAL = 60
+    try:
+        response = author_client.post(
+            detail_url, data={'text': NEW_COMMENT_TEXT}
+        )
+        assert not Comment.objects.filter(text=NEW_COMMENT_TEXT).exists()
+        response = author_client.get(response.url)
+        assert NEW_COMMENT_TEXT in response.content.decode()
+        comment_count = news.comment_count
+        news.refresh_from_db()
+        assert news.comment_count == comment_count + 1
+    finally:
+        comment_buffer.flush()
+
+
+def test_full_buffer_is_flushed(settings, author_client, detail_url):
+    settings.COMMENT_WRITE_BUFFER = True
+    settings.COMMENT_BUFFER_SIZE = 2
+    for _ in range(2):
+        author_client.post(detail_url, data={'text': NEW_COMMENT_TEXT})
+    assert Comment.objects.filter(text=NEW_COMMENT_TEXT).count() == 2
+    assert len(comment_buffer) == 0
+
+
+def test_failed_flush_keeps_comments(settings, news, author, caplog):
+    settings.COMMENT_BUFFER_INTERVAL = 60
+    buffer = CommentBuffer()
+    for text in ('saved', 'locked', 'orphan'):
+        buffer.add(Comment(news=news, author=author, text=text))
+
+    def add_comments(comments):
+        if len(comments) > 1 or comments[0].text == 'locked':
+            raise OperationalError('database is locked')
+        if comments[0].text == 'orphan':
+            raise IntegrityError('FOREIGN KEY constraint failed')
+        transfer.add_comments(comments)
+
+    with patch('news.buffer.add_comments', add_comments):
+        assert buffer.flush() == 1
+    try:
+        assert list(Comment.objects.filter(
+            text__in=('saved', 'locked', 'orphan')
+        ).values_list('text', flat=True)) == ['saved']
+        assert [comment.text for comment in buffer._pending] == ['locked']
+        assert buffer._timer is not None
+        assert 'отброшен' in caplog.text
+    finally:
+        buffer._timer.cancel()
+
+
+def test_admin_delete_action_is_one_delete(admin_client, news, comments):
+    selected = list(Comment.objects.values_list('pk', flat=True)[:4])
+    with CaptureQueriesContext(connection) as queries:
+        admin_client.post(reverse('admin:news_comment_changelist'), {
+            'action': 'delete_comments', '_selected_action': selected,
+        })
+    deletes = [
+        query for query in queries
+        if query['sql'].startswith('DELETE FROM "news_comment"')
+    ]
+    assert len(deletes) == 1
+    assert not Comment.objects.filter(pk__in=selected).exists()
+    news.refresh_from_db()
+    assert news.comment_count == Comment.objects.filter(news=news).count()
+
+
+def test_default_page_cache_key(rf):
+    page = AnonymousPageCacheMixin()
+    page.request = rf.get('/page/', {'q': 'one'})
+    key = page.get_page_cache_key()
+    assert page.get_page_cache_key() == key
+    page.request = rf.get('/page/', {'q': 'two'})
+    assert page.get_page_cache_key() != key
+    page.request = rf.get('/page/', {'q': 'one'})
+    invalidate(HOME_VERSION_KEY)
+    assert page.get_page_cache_key() != key
+
+
+def test_admin_hide_action_updates_text(admin_client, comment):
+    news_key = NEWS_VERSION_KEY.format(pk=comment.news_id)
+    home_version, news_version = map(
+        get_version, (HOME_VERSION_KEY, news_key)
+    )
+    admin_client.post(reverse('admin:news_comment_changelist'), {
+        'action': 'hide_comments', '_selected_action': [comment.pk],
+    })
+    comment.refresh_from_db()
+    assert comment.text == MODERATED_TEXT
+    assert get_version(HOME_VERSION_KEY) == home_version
+    assert get_version(news_key) != news_version
@@ -1,6 +1,12 @@
 from http import HTTPStatus
 
 import pytest
+from django.urls import NoReverseMatch, reverse
+
+from news.models import Comment, News
+from yanews.metrics import view_stats
+from yanews.templating import warm_templates
+from yanews.urlbuilder import fast_reverse
 
 
 def test_pages_availability(client, public_urls):
@@ -23,3 +29,101 @@ def test_availability_for_comment_edit_and_delete(
         assert response.status_code == expected_status
         if redirect:
             assert response.url == f'{login_url}?next={url}'
+
+
+def test_view_metrics(settings, client, home_url, caplog):
+    settings.VIEW_METRICS = True
+    settings.VIEW_BUDGETS = {'news:home': {'queries': 0}}
+    view_stats.reset()
+    client.get(home_url)
+    metrics = client.get(reverse('metrics')).json()['news:home']
+    assert metrics['queries']['count'] == 1
+    assert metrics['queries']['sum'] >= 1
+    assert metrics['template_ms']['sum'] > 0
+    assert 'news:home' in caplog.text
+
+
+def test_view_metrics_count_streaming_body(settings, client, api_news_url):
+    settings.VIEW_METRICS = True
+    view_stats.reset()
+    response = client.get(api_news_url)
+    assert 'news:api_news' not in view_stats.snapshot()
+    b''.join(response.streaming_content)
+    metrics = view_stats.snapshot()['news:api_news']
+    assert metrics['queries']['count'] == 1
+    assert metrics['queries']['sum'] >= 1
+
+
+def test_view_metrics_endpoint_is_disabled_by_default(client):
+    response = client.get(reverse('metrics'))
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+def test_template_profiling(settings, client, detail_url, comments, caplog):
+    settings.TEMPLATE_PROFILING = True
+    caplog.set_level('INFO', logger='yanews.templating')
+    response = client.get(detail_url)
+    profile = response.wsgi_request.template_profile
+    assert profile.calls[('news/detail.html', 0, 'template')] == 1
+    assert profile.calls[
+        ('news/comment.html', 0, 'template')
+    ] == Comment.objects.count()
+    assert 'tpl0;desc=' in response['Server-Timing']
+    assert 'news/detail.html' in caplog.text
+
+
+def test_warm_templates_compiles_every_template(settings):
+    templates = settings.BASE_DIR / 'templates'
+    assert warm_templates() == sum(
+        path.is_file() for path in templates.rglob('*')
+    )
+
+
+def test_detail_conditional_get(
+    client, author_client, detail_url, edit_url, django_assert_num_queries
+):
+    response = client.get(detail_url)
+    assert response.has_header('Last-Modified')
+    # Валидаторы берутся из кеша, БД не нужна.
+    with django_assert_num_queries(0):
+        response = client.get(
+            detail_url, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    etag = response['ETag']
+    author_client.post(edit_url, data={'text': 'Edited'})
+    response = client.get(detail_url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.OK
+
+
+@pytest.mark.parametrize('name', ['news:rss', 'news:atom'])
+def test_feed_is_prerendered(client, news, name, django_assert_num_queries):
+    url = reverse(name)
+    response = client.get(url)
+    assert response.status_code == HTTPStatus.OK
+    assert news.title in response.content.decode()
+    with django_assert_num_queries(0):
+        assert client.get(url).content == response.content
+        response = client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    News.objects.create(title='Свежая новость', text='Текст')
+    response = client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+    assert response.status_code == HTTPStatus.OK
+    assert 'Свежая новость' in response.content.decode()
+
+
+@pytest.mark.parametrize('name, args', [
+    ('news:home', ()),
+    ('news:detail', (1,)),
+    ('news:detail', ('25',)),
+    ('news:edit', (10 ** 12,)),
+    ('news:delete', (7,)),
+])
+def test_fast_reverse_matches_reverse(name, args):
+    assert fast_reverse(name, *args) == reverse(name, args=args)
+
+
+@pytest.mark.parametrize('args', [('abc',), ('1/2',), (), (1, 2)])
+def test_fast_reverse_rejects_what_reverse_rejects(args):
+    with pytest.raises(NoReverseMatch):
+        fast_reverse('news:edit', *args)
@@ -0,0 +1,145 @@
+"""Полнотекстовый поиск по новостям и комментариям.
+
+Заголовки и тексты новостей и тексты комментариев индексируются в
+таблицах SQLite FTS5 с внешним содержимым. Триггеры из миграции
+обновляют индекс при любой записи, включая bulk-операции импорта. Поиск
+возвращает только id, заголовок, дату и фрагмент с подсветкой, а полные
+тексты новостей в Python не загружаются.
+"""
+import re
+from collections import namedtuple
+
+from django.db import connection
+from django.db.models import Q
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import News
+
+NEWS_TABLE = 'news_news_search'
+COMMENT_TABLE = 'news_comment_search'
+# Комментарий совпадает с запросом, но весит меньше самой новости.
+COMMENT_RANK_FACTOR = 0.5
+SNIPPET_TOKENS = 16
+# Маркеры подсветки не встречаются в тексте и переживают экранирование.
+MARK_START, MARK_END = '\x02', '\x03'
+
+PHRASE = re.compile(r'"([^"]*)"|(\S+)')
+
+SearchResult = namedtuple('SearchResult', ('pk', 'title', 'date', 'snippet'))
+
+
+def parse_phrases(query):
+    """Фразы в кавычках и отдельные слова запроса."""
+    phrases = (
+        ' '.join((phrase or word).split())
+        for phrase, word in PHRASE.findall(query)
+    )
+    return [phrase for phrase in phrases if phrase]
+
+
+def build_match(query):
+    """Выражение FTS5: фразы и слова через AND.
+
+    Каждая часть передаётся строкой в кавычках, поэтому операторы FTS5 из
+    пользовательского ввода не интерпретируются.
+    """
+    return ' AND '.join(
+        '"{}"'.format(phrase.replace('"', '""'))
+        for phrase in parse_phrases(query)
+    )
+
+
+def use_fts():
+    """FTS5 используется, если миграция смогла создать его таблицы."""
+    name = connection.settings_dict['NAME']
+    if name not in use_fts.cache:
+        use_fts.cache[name] = (
+            connection.vendor == 'sqlite'
+            and NEWS_TABLE in connection.introspection.table_names()
+        )
+    return use_fts.cache[name]
+
+
+use_fts.cache = {}
+
+
+def highlight(snippet):
+    if snippet is None:
+        return None
+    return mark_safe(
+        escape(snippet).replace(MARK_START, '<mark>').replace(
+            MARK_END, '</mark>'
+        )
+    )
+
+
+def search_news(query, date_from=None, date_to=None, offset=0, limit=20):
+    """Новости по убыванию релевантности с фрагментом лучшего совпадения."""
+    match = build_match(query)
+    if not match:
+        return []
+    if not use_fts():
+        return search_news_fallback(query, date_from, date_to, offset, limit)
+    dates, params = [], [match, match]
+    if date_from is not None:
+        dates.append('AND news.date >= %s')
+        params.append(date_from)
+    if date_to is not None:
+        dates.append('AND news.date <= %s')
+        params.append(date_to)
+    snippet = (
+        f"'{MARK_START}', '{MARK_END}', '…', {SNIPPET_TOKENS}"
+    )
+    # Для MIN() SQLite берёт остальные столбцы из строки с минимумом,
+    # так что фрагмент относится к лучшему совпадению.
+    sql = f'''
+        WITH hits (news_id, rank, snippet) AS (
+            SELECT rowid, bm25({NEWS_TABLE}, 2.0, 1.0),
+                   snippet({NEWS_TABLE}, -1, {snippet})
+            FROM {NEWS_TABLE} WHERE {NEWS_TABLE} MATCH %s
+            UNION ALL
+            SELECT comment.news_id,
+                   bm25({COMMENT_TABLE}) * {COMMENT_RANK_FACTOR},
+                   snippet({COMMENT_TABLE}, 0, {snippet})
+            FROM {COMMENT_TABLE}
+            JOIN news_comment AS comment
+                ON comment.id = {COMMENT_TABLE}.rowid
+            WHERE {COMMENT_TABLE} MATCH %s
+        )
+        SELECT news.id, news.title, news.date, hits.snippet,
+               MIN(hits.rank) AS best
+        FROM hits JOIN news_news AS news ON news.id = hits.news_id
+        WHERE 1 {' '.join(dates)}
+        GROUP BY news.id
+        ORDER BY best, news.id
+        LIMIT %s OFFSET %s
+    '''
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [*params, limit, offset])
+        rows = cursor.fetchall()
+    return [
+        SearchResult(pk, title, date, highlight(snippet))
+        for pk, title, date, snippet, _ in rows
+    ]
+
+
+def search_news_fallback(query, date_from, date_to, offset, limit):
+    """Поиск без FTS5: подстрока в заголовке, тексте или комментариях."""
+    condition = Q()
+    for phrase in parse_phrases(query):
+        condition &= (
+            Q(title__icontains=phrase) | Q(text__icontains=phrase)
+            | Q(comment__text__icontains=phrase)
+        )
+    news = News.objects.filter(condition)
+    if date_from is not None:
+        news = news.filter(date__gte=date_from)
+    if date_to is not None:
+        news = news.filter(date__lte=date_to)
+    return [
+        SearchResult(pk, title, date, None)
+        for pk, title, date in news.distinct().order_by(
+            '-date', 'id'
+        ).values_list('id', 'title', 'date')[offset:offset + limit]
+    ]
@@ -0,0 +1,58 @@
+"""Ограничение частоты комментариев алгоритмом token bucket.
+
+Состояние корзин хранится в кеше новостей, поэтому лимиты общие для
+процессов с общим кешем. Чтение и запись корзин внутри процесса идут под
+блокировкой; между процессами возможна гонка, которая лишь изредка
+пропустит лишний комментарий. С файловым кешем продакшен-профиля лимиты
+между процессами поэтому приблизительные.
+"""
+import threading
+import time
+
+from django.conf import settings
+
+from .cache import get_cache
+
+BUCKET_KEY = 'throttle:comment:{scope}:{ident}'
+
+_lock = threading.Lock()
+
+
+def refill(state, rate, burst, now):
+    """Число токенов в корзине к моменту now."""
+    if state is None:
+        return burst
+    tokens, updated = state
+    return min(burst, tokens + (now - updated) * rate)
+
+
+def take(buckets, now=None):
+    """Берёт по токену из всех корзин или не берёт ни одного.
+
+    buckets — пары (ключ, (число, секунды)): не больше «числа»
+    комментариев за «секунды» с таким же запасом на всплеск.
+    """
+    now = time.time() if now is None else now
+    cache = get_cache()
+    with _lock:
+        states = cache.get_many([key for key, _ in buckets])
+        tokens = {}
+        for key, (count, period) in buckets:
+            tokens[key] = refill(states.get(key), count / period, count, now)
+            if tokens[key] < 1:
+                return False
+        cache.set_many({
+            key: (tokens[key] - 1, now) for key, (_, period) in buckets
+        }, max(period for _, (_, period) in buckets))
+    return True
+
+
+def allow_comment(user_id, news_id):
+    """Можно ли пользователю сейчас комментировать новость."""
+    limits = settings.COMMENT_RATE_LIMITS
+    buckets = [
+        (BUCKET_KEY.format(scope=scope, ident=ident), limits[scope])
+        for scope, ident in (('user', user_id), ('news', news_id))
+        if limits.get(scope)
+    ]
+    return not buckets or take(buckets)
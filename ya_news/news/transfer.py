@@ -0,0 +1,216 @@
+"""Потоковый импорт и экспорт новостей и комментариев в JSONL и CSV.
+
+Записи читаются и пишутся по одной, а в БД уходят пачками через
+bulk_create, поэтому память не растёт с размером файла.
+"""
+import csv
+import json
+import time
+from collections import defaultdict
+from datetime import date
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from .cache import (
+    FEED_VERSION_KEY, HOME_VERSION_KEY, NEWS_VERSION_KEY, invalidate
+)
+from .models import Comment, News, make_summary
+
+FORMATS = ('jsonl', 'csv')
+NEWS_FIELDS = ('external_id', 'title', 'text', 'date')
+COMMENT_FIELDS = ('news_id', 'news_external_id', 'author', 'text', 'created')
+
+User = get_user_model()
+
+
+def guess_format(path, fmt=None):
+    if fmt:
+        return fmt
+    return 'csv' if str(path).endswith('.csv') else 'jsonl'
+
+
+def read_records(file, fmt):
+    if fmt == 'csv':
+        yield from csv.DictReader(file)
+        return
+    for line in file:
+        if line.strip():
+            yield json.loads(line)
+
+
+class RecordWriter:
+
+    def __init__(self, file, fmt, fields):
+        self.file = file
+        self.csv = None
+        if fmt == 'csv':
+            self.csv = csv.DictWriter(file, fieldnames=fields)
+            self.csv.writeheader()
+
+    def write(self, record):
+        if self.csv is not None:
+            self.csv.writerow(record)
+        else:
+            self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class Progress:
+    """Считает обработанные строки и скорость."""
+
+    def __init__(self, write):
+        self.write = write
+        self.started = time.monotonic()
+        self.total = 0
+
+    @property
+    def rate(self):
+        return self.total / max(time.monotonic() - self.started, 1e-9)
+
+    def add(self, count):
+        self.total += count
+        self.write(f'{self.total} строк, {self.rate:.0f} строк/с')
+
+
+def import_news_batch(records):
+    """Создаёт новые новости и обновляет существующие по external_id.
+
+    Дата обновляется, только если она есть в записи. Из записей с
+    одинаковым external_id в пачке берётся последняя, остальные считаются
+    пропущенными.
+    """
+    by_external_id = {}
+    anonymous = []
+    for record in records:
+        news = News(
+            external_id=record.get('external_id') or None,
+            title=record['title'],
+            text=record['text'],
+            summary=make_summary(record['text']),
+            date=date.fromisoformat(record['date']) if record.get('date')
+            else None,
+        )
+        if news.external_id:
+            by_external_id[news.external_id] = news
+        else:
+            anonymous.append(news)
+    with transaction.atomic():
+        existing = dict(News.objects.filter(
+            external_id__in=by_external_id
+        ).values_list('external_id', 'pk'))
+        to_create = anonymous[:]
+        to_update = defaultdict(list)
+        for external_id, news in by_external_id.items():
+            if external_id in existing:
+                news.pk = existing[external_id]
+                to_update[news.date is not None].append(news)
+            else:
+                to_create.append(news)
+        for news in to_create:
+            if news.date is None:
+                news.date = date.today()
+        News.objects.bulk_create(to_create)
+        fields = ('title', 'text', 'summary')
+        News.objects.bulk_update(to_update[True], (*fields, 'date'))
+        News.objects.bulk_update(to_update[False], fields)
+        updated = [*to_update[True], *to_update[False]]
+        # bulk-операции не шлют сигналы, сбрасываем кеш сами.
+        invalidate(HOME_VERSION_KEY, FEED_VERSION_KEY, *(
+            NEWS_VERSION_KEY.format(pk=news.pk) for news in updated
+        ))
+    imported = len(to_create) + len(updated)
+    return imported, len(records) - imported
+
+
+def import_comments_batch(records):
+    """Добавляет комментарии; новости и авторы ищутся целиком на пачку.
+
+    Комментарии с неизвестной новостью или автором пропускаются.
+    Поле created задаётся временем импорта, как и при auto_now_add.
+    """
+    external_ids = {
+        record['news_external_id'] for record in records
+        if record.get('news_external_id')
+    }
+    news_ids = dict(News.objects.filter(
+        external_id__in=external_ids
+    ).values_list('external_id', 'pk'))
+    known_ids = set(News.objects.filter(pk__in={
+        int(record['news_id']) for record in records
+        if record.get('news_id')
+    }).values_list('pk', flat=True))
+    authors = dict(User.objects.filter(
+        username__in={record['author'] for record in records}
+    ).values_list('username', 'pk'))
+    comments = []
+    for record in records:
+        news_id = news_ids.get(record.get('news_external_id'))
+        if news_id is None and record.get('news_id'):
+            news_id = int(record['news_id'])
+            news_id = news_id if news_id in known_ids else None
+        author_id = authors.get(record['author'])
+        if news_id and author_id:
+            comments.append(Comment(
+                news_id=news_id, author_id=author_id, text=record['text']
+            ))
+    add_comments(comments)
+    return len(comments), len(records) - len(comments)
+
+
+def add_comments(comments):
+    """Сохраняет комментарии пачкой со счётчиками и сбросом кеша."""
+    added = defaultdict(int)
+    for comment in comments:
+        added[comment.news_id] += 1
+    by_count = defaultdict(list)
+    for news_id, count in added.items():
+        by_count[count].append(news_id)
+    with transaction.atomic():
+        Comment.objects.bulk_create(comments)
+        for count, news_ids in by_count.items():
+            News.objects.filter(pk__in=news_ids).shift_comment_count(count)
+        invalidate(HOME_VERSION_KEY, *(
+            NEWS_VERSION_KEY.format(pk=news_id) for news_id in added
+        ))
+
+
+def export_news(chunk_size):
+    return (
+        {**record, 'date': record['date'].isoformat()}
+        for record in News.objects.order_by('pk').values(
+            *NEWS_FIELDS
+        ).iterator(chunk_size)
+    )
+
+
+def export_comments(chunk_size):
+    return (
+        {
+            'news_id': record['news_id'],
+            'news_external_id': record['news__external_id'],
+            'author': record['author__username'],
+            'text': record['text'],
+            'created': record['created'].isoformat(),
+        }
+        for record in Comment.objects.order_by('pk').values(
+            'news_id', 'news__external_id', 'author__username', 'text',
+            'created'
+        ).iterator(chunk_size)
+    )
+
+
+IMPORTERS = {'news': import_news_batch, 'comment': import_comments_batch}
+EXPORTERS = {
+    'news': (export_news, NEWS_FIELDS),
+    'comment': (export_comments, COMMENT_FIELDS),
+}
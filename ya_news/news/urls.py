@@ -1,12 +1,54 @@
-from django.urls import path
+from django.conf import settings
+from django.urls import URLPattern, path
+from django.urls.resolvers import RoutePattern
 
-from news import views
+from news import feeds, views
 
 app_name = 'news'
 
+
+class AsyncSwitchPattern(URLPattern):
+    """Маршрут с синхронным и асинхронным вариантом представления.
+
+    Вариант выбирается по NEWS_ASYNC_VIEWS при каждом разрешении URL,
+    поэтому настройку можно менять через override_settings.
+    """
+
+    def __init__(self, route, sync_view, async_view, name):
+        super().__init__(
+            RoutePattern(route, name=name, is_endpoint=True), sync_view,
+            name=name
+        )
+        self.async_view = async_view
+
+    @property
+    def callback(self):
+        if settings.NEWS_ASYNC_VIEWS:
+            return self.async_view
+        return self.sync_view
+
+    @callback.setter
+    def callback(self, view):
+        self.sync_view = view
+
+
 urlpatterns = [
-    path('', views.NewsList.as_view(), name='home'),
-    path('news/<int:pk>/', views.NewsDetailView.as_view(), name='detail'),
+    AsyncSwitchPattern(
+        '', views.NewsList.as_view(), views.news_list_async, 'home'
+    ),
+    path('search/', views.NewsSearch.as_view(), name='search'),
+    path('feeds/rss/', feeds.rss_feed, name='rss'),
+    path('feeds/atom/', feeds.atom_feed, name='atom'),
+    path('api/news/', views.NewsFeedJSON.as_view(), name='api_news'),
+    AsyncSwitchPattern(
+        'news/<int:pk>/', views.NewsDetailView.as_view(),
+        views.news_detail_async, 'detail'
+    ),
+    path(
+        'news/<int:pk>/comments/',
+        views.NewsCommentsPage.as_view(),
+        name='comments'
+    ),
     path(
         'delete_comment/<int:pk>/',
         views.CommentDelete.as_view(),
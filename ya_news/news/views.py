@@ -1,14 +1,57 @@
+from hashlib import md5
+from http import HTTPStatus
+
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.handlers.asgi import ASGIRequest
+from django.db import close_old_connections
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.urls import reverse
+from django.utils.decorators import method_decorator
 from django.views import generic
+from django.views.decorators.http import condition
 
-from .forms import CommentForm
+from .api import stream_feed
+from .buffer import comment_buffer
+from .cache import (
+    AnonymousPageCacheMixin, get_cached_comments_page, get_news_state,
+    home_page_key, news_page_key
+)
+from .forms import THROTTLED, CommentForm, SearchForm
 from .models import Comment, News
+from .pagination import decode_cursor
+from .search import search_news
+from .throttle import allow_comment
+
+
+def get_news_validators(request, pk):
+    """Валидаторы ETag и Last-Modified страницы новости."""
+    if not hasattr(request, 'news_validators'):
+        request.news_validators = None
+        state = get_news_state(pk)
+        if state is not None:
+            version, last_modified = state
+            # Страница отличается для разных пользователей.
+            etag = md5(
+                f'{pk}:{version}:{request.user.pk}'.encode()
+            ).hexdigest()
+            request.news_validators = etag, last_modified
+    return request.news_validators
+
+
+def news_etag(request, pk):
+    validators = get_news_validators(request, pk)
+    return validators and validators[0]
+
+
+def news_last_modified(request, pk):
+    validators = get_news_validators(request, pk)
+    return validators and validators[1]
 
 
-class NewsList(generic.ListView):
+class NewsList(AnonymousPageCacheMixin, generic.ListView):
     """Список новостей."""
     model = News
     template_name = 'news/home.html'
@@ -19,29 +62,117 @@ class NewsList(generic.ListView):
 
         Их количество определяется в настройках проекта.
         """
-        return self.model.objects.prefetch_related(
-            'comment_set'
-        )[:settings.NEWS_COUNT_ON_HOME_PAGE]
+        return self.model.objects.defer('text')[
+            :settings.NEWS_COUNT_ON_HOME_PAGE
+        ]
 
+    def get_page_cache_key(self):
+        return home_page_key()
 
-class NewsDetail(generic.DetailView):
+
+class NewsDetail(AnonymousPageCacheMixin, generic.DetailView):
     model = News
     template_name = 'news/detail.html'
 
+    def get_page_cache_key(self):
+        return news_page_key(self.kwargs['pk'])
+
     def get_object(self, queryset=None):
-        obj = get_object_or_404(
-            self.model.objects.prefetch_related('comment_set__author'),
-            pk=self.kwargs['pk']
-        )
-        return obj
+        return get_object_or_404(self.model, pk=self.kwargs['pk'])
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        context['comments'], context['next_cursor'] = (
+            get_cached_comments_page(self.object.pk)
+        )
         if self.request.user.is_authenticated:
             context['form'] = CommentForm()
         return context
 
 
+class NewsCommentsPage(generic.TemplateView):
+    """Следующая страница комментариев к новости."""
+    template_name = 'news/comments.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        cursor = None
+        if 'after' in self.request.GET:
+            cursor = decode_cursor(self.request.GET['after'])
+            if cursor is None:
+                raise Http404('Некорректный курсор.')
+        context['news_id'] = self.kwargs['pk']
+        context['comments'], context['next_cursor'] = (
+            get_cached_comments_page(self.kwargs['pk'], cursor)
+        )
+        return context
+
+
+class NewsSearch(generic.TemplateView):
+    """Поиск по новостям и комментариям к ним."""
+    template_name = 'news/search.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        form = SearchForm(self.request.GET or None)
+        context['form'] = form
+        if not form.is_valid() or not form.cleaned_data['q']:
+            return context
+        data = form.cleaned_data
+        page = data['page'] or 1
+        size = settings.NEWS_SEARCH_PAGE_SIZE
+        results = search_news(
+            data['q'], data['date_from'], data['date_to'],
+            offset=(page - 1) * size, limit=size + 1
+        )
+        params = self.request.GET.copy()
+        context['results'] = results[:size]
+        if page > 1:
+            params['page'] = page - 1
+            context['previous_query'] = params.urlencode()
+        if len(results) > size:
+            params['page'] = page + 1
+            context['next_query'] = params.urlencode()
+        return context
+
+
+class NewsFeedJSON(generic.View):
+    """Лента новостей в JSON со счётчиками комментариев."""
+
+    def get(self, request):
+        # Параметры проверяются до ответа: после первого куска потока
+        # ошибку уже не вернуть, клиент получил бы обрезанный JSON.
+        cursor = None
+        if 'after' in request.GET:
+            cursor = decode_cursor(request.GET['after'])
+            if cursor is None:
+                raise Http404('Некорректный курсор.')
+            cursor = cursor[0].date(), cursor[1]
+        try:
+            limit = int(request.GET.get('limit', settings.NEWS_API_PAGE_SIZE))
+        except ValueError:
+            raise Http404('Некорректный параметр limit.')
+        if not 0 < limit <= settings.NEWS_API_MAX_PAGE_SIZE:
+            raise Http404('Некорректный параметр limit.')
+
+        def next_url(cursor):
+            params = request.GET.copy()
+            params['after'] = cursor
+            return request.build_absolute_uri(f'?{params.urlencode()}')
+
+        chunks = stream_feed(cursor, limit, next_url)
+        if isinstance(request, ASGIRequest):
+            # ASGI-обработчик Django 3.2 читает потоковый ответ в цикле
+            # событий, где ORM недоступен: документ собирается здесь, в
+            # потоке представления. Потоковая отдача есть только в WSGI.
+            return HttpResponse(
+                ''.join(chunks), content_type='application/json'
+            )
+        return StreamingHttpResponse(
+            chunks, content_type='application/json'
+        )
+
+
 class NewsComment(
         LoginRequiredMixin,
         generic.detail.SingleObjectMixin,
@@ -55,21 +186,47 @@ class NewsComment(
         self.object = self.get_object()
         return super().post(request, *args, **kwargs)
 
+    def get_context_data(self, **kwargs):
+        """Форма с ошибкой показывается на странице вместе с комментариями."""
+        context = super().get_context_data(**kwargs)
+        context['comments'], context['next_cursor'] = (
+            get_cached_comments_page(self.object.pk)
+        )
+        return context
+
     def form_valid(self, form):
+        if not allow_comment(self.request.user.id, self.object.pk):
+            form.add_error('text', THROTTLED)
+            response = self.form_invalid(form)
+            response.status_code = HTTPStatus.TOO_MANY_REQUESTS
+            return response
         comment = form.save(commit=False)
         comment.news = self.object
         comment.author = self.request.user
-        comment.save()
+        if settings.COMMENT_WRITE_BUFFER:
+            comment_buffer.add(comment)
+        else:
+            comment.save()
         return super().form_valid(form)
 
     def get_success_url(self):
-        post = self.get_object()
-        return reverse('news:detail', kwargs={'pk': post.pk}) + '#comments'
+        return reverse(
+            'news:detail', kwargs={'pk': self.object.pk}
+        ) + '#comments'
 
 
 class NewsDetailView(generic.View):
 
     def get(self, request, *args, **kwargs):
+        # Автор видит свой комментарий из буфера сразу после редиректа.
+        if len(comment_buffer) and comment_buffer.has_pending(
+            request.user.id, kwargs['pk']
+        ):
+            comment_buffer.flush()
+        return self.conditional_get(request, *args, **kwargs)
+
+    @method_decorator(condition(news_etag, news_last_modified))
+    def conditional_get(self, request, *args, **kwargs):
         view = NewsDetail.as_view()
         return view(request, *args, **kwargs)
 
@@ -83,9 +240,8 @@ class CommentBase(LoginRequiredMixin):
     model = Comment
 
     def get_success_url(self):
-        comment = self.get_object()
         return reverse(
-            'news:detail', kwargs={'pk': comment.news.pk}
+            'news:detail', kwargs={'pk': self.object.news_id}
         ) + '#comments'
 
     def get_queryset(self):
@@ -102,3 +258,37 @@ class CommentUpdate(CommentBase, generic.UpdateView):
 class CommentDelete(CommentBase, generic.DeleteView):
     """Удаление комментария."""
     template_name = 'news/delete.html'
+
+
+def render_in_worker(view, request, *args, **kwargs):
+    """Вызов синхронного представления вместе с рендерингом шаблона.
+
+    Выполняется в потоке из пула, который сам закрывает соединение с БД:
+    обработчик запроса закрывает соединения только в своём потоке.
+    """
+    try:
+        response = view(request, *args, **kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        return response
+    finally:
+        close_old_connections()
+
+
+# thread_sensitive=False: запросы не ждут друг друга в единственном
+# общем потоке, через который ASGI пропускает синхронные представления.
+run_in_worker = sync_to_async(render_in_worker, thread_sensitive=False)
+
+
+async def news_list_async(request):
+    """Асинхронный вариант NewsList для ASGI.
+
+    Кеш, запросы и рендеринг выполняются за один переход в поток, а
+    готовый ответ возвращается без дополнительных переходов.
+    """
+    return await run_in_worker(NewsList.as_view(), request)
+
+
+async def news_detail_async(request, pk):
+    """Асинхронный вариант NewsDetailView, включая условный GET."""
+    return await run_in_worker(NewsDetailView.as_view(), request, pk=pk)
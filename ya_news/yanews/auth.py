@@ -0,0 +1,102 @@
+"""Сессия и пользователь из кеша для авторизованных запросов.
+
+Включается настройкой CACHED_AUTH = True вместе с
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db': тогда
+сессию читает из кеша SessionMiddleware, а CachedUserMiddleware берёт из
+кеша пользователя. Хеш пароля в сессии сверяется с кешированным
+пользователем так же, как в auth.get_user, а запись пользователя
+удаляется из кеша при любом его сохранении, удалении и выходе.
+Обработчики сигналов подключает AppConfig.ready, так что кеш сбрасывают
+и процессы без этого middleware: manage.py changepassword, shell, воркеры.
+"""
+import asyncio
+
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.auth.signals import user_logged_out
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.db.models.signals import post_delete, post_save
+from django.utils.crypto import constant_time_compare
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.functional import SimpleLazyObject
+
+USER_KEY = 'auth:user:{pk}'
+
+
+def get_cache():
+    # Кеш должен быть общим для процессов: иначе смена пароля в одном
+    # процессе не сбросила бы пользователя в остальных.
+    return caches[settings.AUTH_CACHE_ALIAS]
+
+
+def forget_user(pk):
+    get_cache().delete(USER_KEY.format(pk=pk))
+
+
+def get_cached_user(request):
+    """То же, что auth.get_user, но без запроса к БД при попадании в кеш."""
+    session = request.session
+    try:
+        user_id = auth.get_user_model()._meta.pk.to_python(
+            session[auth.SESSION_KEY]
+        )
+        backend_path = session[auth.BACKEND_SESSION_KEY]
+    except KeyError:
+        return AnonymousUser()
+    if backend_path not in settings.AUTHENTICATION_BACKENDS:
+        return AnonymousUser()
+    cache = get_cache()
+    key = USER_KEY.format(pk=user_id)
+    user = cache.get(key)
+    if user is None:
+        user = auth.load_backend(backend_path).get_user(user_id)
+        if user is None:
+            return AnonymousUser()
+        cache.set(key, user, settings.AUTH_CACHE_TIMEOUT)
+    session_hash = session.get(auth.HASH_SESSION_KEY)
+    if not (session_hash and constant_time_compare(
+        session_hash, user.get_session_auth_hash()
+    )):
+        session.flush()
+        return AnonymousUser()
+    return user
+
+
+class CachedUserMiddleware(MiddlewareMixin):
+    """Подменяет request.user после AuthenticationMiddleware."""
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'CACHED_AUTH', False):
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self):
+            return self.__acall__(request)
+        self.process_request(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        # Пользователь читается лениво, в потоке представления.
+        self.process_request(request)
+        return await self.get_response(request)
+
+    def process_request(self, request):
+        request.user = SimpleLazyObject(lambda: get_cached_user(request))
+
+
+def user_changed(sender, instance, **kwargs):
+    forget_user(instance.pk)
+
+
+def user_left(sender, request, user, **kwargs):
+    if user is not None:
+        forget_user(user.pk)
+
+
+def connect_receivers():
+    for signal in (post_save, post_delete):
+        signal.connect(user_changed, sender=settings.AUTH_USER_MODEL)
+    user_logged_out.connect(user_left)
@@ -21,11 +21,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'yanews.metrics.ViewMetricsMiddleware',
+    'yanews.templating.TemplateProfilerMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'yanews.auth.CachedUserMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -44,6 +47,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            'libraries': {'fast_url': 'yanews.urlbuilder'},
         },
     },
 ]
@@ -59,6 +63,13 @@ DATABASES = {
 }
 
 
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+
 AUTH_PASSWORD_VALIDATORS = []
 
 
@@ -80,3 +91,44 @@ LOGIN_URL = reverse_lazy('users:login')
 LOGIN_REDIRECT_URL = reverse_lazy('news:home')
 
 NEWS_COUNT_ON_HOME_PAGE = 10
+# Длина News.summary в словах; после изменения: manage.py fill_summaries.
+NEWS_SUMMARY_WORDS = 15
+NEWS_SEARCH_PAGE_SIZE = 20
+NEWS_API_PAGE_SIZE = 100
+NEWS_FEED_SIZE = 20
+# Позволяет выгрузить всю ленту одной потоковой страницей.
+NEWS_API_MAX_PAGE_SIZE = 1_000_000
+# Асинхронные представления главной и новости для запуска под ASGI.
+NEWS_ASYNC_VIEWS = False
+
+COMMENTS_COUNT_ON_PAGE = 50
+NEWS_ADMIN_COMMENTS = 10
+# Не больше N комментариев за столько-то секунд; None отключает лимит.
+COMMENT_RATE_LIMITS = {
+    'user': (5, 60),
+    'news': (120, 60),
+}
+# Копить комментарии и сохранять их пачками, см. news/buffer.py.
+COMMENT_WRITE_BUFFER = False
+COMMENT_BUFFER_INTERVAL = 1.0
+COMMENT_BUFFER_SIZE = 100
+
+BAD_WORDS_FILE = None
+
+NEWS_CACHE_ALIAS = 'default'
+NEWS_CACHE_TIMEOUT = 60 * 5
+
+VIEW_METRICS = False
+VIEW_BUDGETS = {
+    'default': {'queries': 10, 'wall_ms': 200},
+}
+
+# Время шаблонов, include и тегов за запрос, см. yanews/templating.py.
+TEMPLATE_PROFILING = False
+TEMPLATE_PROFILING_TOP = 15
+
+# Сессия и пользователь из кеша, см. yanews/auth.py. Включать вместе с
+# SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'.
+CACHED_AUTH = False
+AUTH_CACHE_ALIAS = 'default'
+AUTH_CACHE_TIMEOUT = 60 * 5
@@ -0,0 +1,15 @@
+"""Прагмы SQLite для каждого нового соединения.
+
+Обработчик сигнала connection_created подключается в AppConfig.ready и
+применяет настройку SQLITE_PRAGMAS; по умолчанию она пуста.
+"""
+from django.conf import settings
+
+
+def apply_pragmas(sender, connection, **kwargs):
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', None)
+    if connection.vendor != 'sqlite' or not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
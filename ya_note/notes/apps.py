@@ -1,6 +1,16 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+
+from yanote.sqlite import apply_pragmas
 
 
 class NotesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'notes'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        connection_created.connect(apply_pragmas)
+        # Модели auth нельзя импортировать до готовности реестра.
+        from yanote.auth import connect_receivers
+        connect_receivers()
@@ -0,0 +1,24 @@
+"""Число заметок пользователя, которое дёшево показывать на каждой странице.
+
+Значение считается по индексу (author, id) один раз и лежит в кеше, пока
+сигналы не сбросят его при создании или удалении заметки.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Note
+
+NOTES_COUNT_KEY = 'notes:count:{user_id}'
+
+
+def get_notes_count(user_id):
+    key = NOTES_COUNT_KEY.format(user_id=user_id)
+    count = cache.get(key)
+    if count is None:
+        count = Note.objects.filter(author_id=user_id).count()
+        cache.set(key, count, settings.NOTES_COUNT_TIMEOUT)
+    return count
+
+
+def reset_notes_count(user_id):
+    cache.delete(NOTES_COUNT_KEY.format(user_id=user_id))
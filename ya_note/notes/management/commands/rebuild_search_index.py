@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from notes.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Заново строит поисковый индекс по всем заметкам.'
+
+    def handle(self, *args, **options):
+        total = rebuild_index()
+        self.stdout.write(f'Проиндексировано заметок: {total}')
@@ -1,8 +1,19 @@
+from functools import lru_cache
+from secrets import token_hex
+
 from django.conf import settings
-from django.db import models
+from django.db import IntegrityError, models, transaction
 
 from pytils.translit import slugify
 
+SLUG_ATTEMPTS = 10
+
+
+@lru_cache(maxsize=4096)
+def make_slug(title, max_length):
+    """Транслитерация повторяющихся заголовков считается один раз."""
+    return slugify(title)[:max_length]
+
 
 class Note(models.Model):
     title = models.CharField(
@@ -27,12 +38,61 @@ class Note(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    updated = models.DateTimeField('Изменена', auto_now=True)
+
+    class Meta:
+        indexes = (
+            models.Index(fields=('author', 'id'), name='note_author_id_idx'),
+        )
 
     def __str__(self):
         return self.title
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            max_slug_length = self._meta.get_field('slug').max_length
-            self.slug = slugify(self.title)[:max_slug_length]
-        super().save(*args, **kwargs)
+        """Пустой slug строится из заголовка и уникален без проверок.
+
+        Вместо запроса exists() полагаемся на уникальный индекс: при
+        конфликте добавляем к slug случайный суффикс и повторяем запись.
+        """
+        if self.slug:
+            return super().save(*args, **kwargs)
+        max_length = self._meta.get_field('slug').max_length
+        base = make_slug(self.title, max_length)
+        self.slug = base
+        for _ in range(SLUG_ATTEMPTS):
+            try:
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                if not Note.objects.filter(slug=self.slug).exists():
+                    raise
+            suffix = f'-{token_hex(3)}'
+            self.slug = base[:max_length - len(suffix)] + suffix
+        raise IntegrityError(f'Не удалось подобрать slug для «{self.title}»')
+
+
+class NoteTerm(models.Model):
+    """Инвертированный индекс для поиска, когда в SQLite нет FTS5."""
+    TERM_LENGTH = 64
+
+    note = models.ForeignKey(
+        Note,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    author = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='+',
+        db_index=False,
+    )
+    term = models.CharField('Основа слова', max_length=TERM_LENGTH)
+    weight = models.PositiveIntegerField('Вес')
+
+    class Meta:
+        indexes = (
+            models.Index(
+                fields=('author', 'term', 'note'),
+                name='noteterm_author_term_idx',
+            ),
+        )
@@ -0,0 +1,204 @@
+"""Полнотекстовый поиск по заметкам.
+
+Текст разбивается на слова, которые приводятся к основе русским
+стеммером (Snowball/Портер). Основы хранятся в таблице SQLite FTS5, если
+она есть, а иначе во встроенном инвертированном индексе NoteTerm. Индекс
+обновляется сигналами при сохранении и удалении заметок. Каждая заметка
+индексируется вместе с токеном автора, поэтому поиск сразу ограничен
+заметками пользователя, а не фильтрует чужие совпадения после.
+"""
+import re
+from collections import Counter
+
+from django.db import connection
+from django.db.models import Count, Sum
+
+from .models import Note, NoteTerm
+
+FTS_TABLE = 'notes_note_search'
+TITLE_WEIGHT = 2
+
+WORD = re.compile(r'\w+')
+VOWELS = 'аеиоуыэюя'
+RV = re.compile(rf'^(.*?[{VOWELS}])(.*)$')
+PERFECTIVE_GERUND = re.compile(
+    r'((ив|ивши|ившись|ыв|ывши|ывшись)|((?<=[ая])(в|вши|вшись)))$'
+)
+REFLEXIVE = re.compile(r'(с[яь])$')
+ADJECTIVE = re.compile(
+    r'(ее|ие|ые|ое|ими|ыми|ей|ий|ый|ой|ем|им|ым|ом|его|ого|ему|ому|их|ых|'
+    r'ую|юю|ая|яя|ою|ею)$'
+)
+PARTICIPLE = re.compile(r'((ивш|ывш|ующ)|((?<=[ая])(ем|нн|вш|ющ|щ)))$')
+VERB = re.compile(
+    r'((ила|ыла|ена|ейте|уйте|ите|или|ыли|ей|уй|ил|ыл|им|ым|ен|ило|ыло|'
+    r'ено|ят|ует|уют|ит|ыт|ены|ить|ыть|ишь|ую|ю)|'
+    r'((?<=[ая])(ла|на|ете|йте|ли|й|л|ем|н|ло|но|ет|ют|ны|ть|ешь|нно)))$'
+)
+NOUN = re.compile(
+    r'(а|ев|ов|ие|ье|е|иями|ями|ами|еи|ии|и|ией|ей|ой|ий|й|иям|ям|ием|ем|'
+    r'ам|ом|о|у|ах|иях|ях|ы|ь|ию|ью|ю|ия|ья|я)$'
+)
+DERIVATIONAL = re.compile(rf'.*[^{VOWELS}]+[{VOWELS}].*ость?$')
+DERIVATIONAL_ENDING = re.compile(r'ость?$')
+SUPERLATIVE = re.compile(r'(ейше|ейш)$')
+
+
+def stem(word):
+    """Основа русского слова по алгоритму Портера; прочие слова как есть."""
+    match = RV.match(word)
+    if match is None:
+        return word
+    start, rv = match.groups()
+    cut = PERFECTIVE_GERUND.sub('', rv, 1)
+    if cut == rv:
+        rv = REFLEXIVE.sub('', rv, 1)
+        cut = ADJECTIVE.sub('', rv, 1)
+        if cut != rv:
+            rv = PARTICIPLE.sub('', cut, 1)
+        else:
+            cut = VERB.sub('', rv, 1)
+            rv = NOUN.sub('', rv, 1) if cut == rv else cut
+    else:
+        rv = cut
+    if rv.endswith('и'):
+        rv = rv[:-1]
+    if DERIVATIONAL.match(rv):
+        rv = DERIVATIONAL_ENDING.sub('', rv, 1)
+    if rv.endswith('ь'):
+        rv = rv[:-1]
+    else:
+        rv = SUPERLATIVE.sub('', rv, 1)
+        if rv.endswith('нн'):
+            rv = rv[:-1]
+    return start + rv
+
+
+def tokenize(text):
+    """Основы слов текста без учёта регистра и различия «ё» и «е»."""
+    return [
+        stem(word)
+        for word in WORD.findall(text.casefold().replace('ё', 'е'))
+    ]
+
+
+def owner_token(author_id):
+    return f'u{author_id}'
+
+
+def use_fts():
+    """FTS5 используется, если миграция смогла создать его таблицу."""
+    name = connection.settings_dict['NAME']
+    if name not in use_fts.cache:
+        use_fts.cache[name] = (
+            connection.vendor == 'sqlite'
+            and FTS_TABLE in connection.introspection.table_names()
+        )
+    return use_fts.cache[name]
+
+
+use_fts.cache = {}
+
+
+def index_notes(notes):
+    """Добавляет или обновляет заметки в индексе одним пакетом."""
+    notes = list(notes)
+    ids = [note.pk for note in notes]
+    remove_notes(ids)
+    if use_fts():
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, owner, title, text) '
+                'VALUES (%s, %s, %s, %s)',
+                [
+                    (
+                        note.pk, owner_token(note.author_id),
+                        ' '.join(tokenize(note.title)),
+                        ' '.join(tokenize(note.text)),
+                    )
+                    for note in notes
+                ]
+            )
+        return
+    terms = []
+    for note in notes:
+        weights = Counter(tokenize(note.text))
+        for term in tokenize(note.title):
+            weights[term] += TITLE_WEIGHT
+        terms.extend(
+            NoteTerm(
+                note_id=note.pk, author_id=note.author_id,
+                term=term[:NoteTerm.TERM_LENGTH], weight=weight
+            )
+            for term, weight in weights.items()
+        )
+    NoteTerm.objects.bulk_create(terms, batch_size=1000)
+
+
+def remove_notes(ids):
+    if use_fts():
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                [(pk,) for pk in ids]
+            )
+    else:
+        NoteTerm.objects.filter(note_id__in=ids).delete()
+
+
+def search_ids(author_id, query, offset, limit):
+    """Идентификаторы заметок автора по убыванию релевантности."""
+    terms = list(dict.fromkeys(tokenize(query)))
+    if not terms:
+        return []
+    if use_fts():
+        match = ' AND '.join(
+            [f'owner:{owner_token(author_id)}']
+            + [f'"{term}"' for term in terms]
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY bm25({FTS_TABLE}, 0, {TITLE_WEIGHT}, 1) '
+                'LIMIT %s OFFSET %s',
+                (match, limit, offset)
+            )
+            return [row[0] for row in cursor.fetchall()]
+    return list(
+        NoteTerm.objects.filter(
+            author_id=author_id,
+            term__in=[term[:NoteTerm.TERM_LENGTH] for term in terms]
+        ).values('note_id').annotate(
+            matched=Count('term'), score=Sum('weight')
+        ).filter(matched=len(terms)).order_by(
+            '-score', 'note_id'
+        ).values_list('note_id', flat=True)[offset:offset + limit]
+    )
+
+
+def search(author_id, query, offset, limit):
+    """Заметки автора по релевантности, только поля для списка."""
+    ids = search_ids(author_id, query, offset, limit)
+    notes = Note.objects.only('id', 'slug', 'title').in_bulk(ids)
+    return [notes[pk] for pk in ids if pk in notes]
+
+
+def rebuild_index(batch_size=1000):
+    """Переиндексирует все заметки, например после массовой загрузки."""
+    if use_fts():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+    else:
+        NoteTerm.objects.all().delete()
+    batch = []
+    total = 0
+    for note in Note.objects.only(
+        'id', 'author_id', 'title', 'text'
+    ).iterator(batch_size):
+        batch.append(note)
+        if len(batch) == batch_size:
+            index_notes(batch)
+            total += len(batch)
+            batch = []
+    index_notes(batch)
+    return total + len(batch)
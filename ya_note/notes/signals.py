@@ -0,0 +1,19 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .counters import reset_notes_count
+from .models import Note
+from .search import index_notes, remove_notes
+
+
+@receiver(post_save, sender=Note)
+def note_saved(sender, instance, created, **kwargs):
+    if created:
+        reset_notes_count(instance.author_id)
+    index_notes([instance])
+
+
+@receiver(post_delete, sender=Note)
+def note_deleted(sender, instance, **kwargs):
+    reset_notes_count(instance.author_id)
+    remove_notes([instance.pk])
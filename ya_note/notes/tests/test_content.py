@@ -1,4 +1,13 @@
+from http import HTTPStatus
+from unittest import skipIf
+
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
 from notes.forms import NoteForm
+from notes.models import Note
 from .test_lib import TestNote
 
 
@@ -22,3 +31,68 @@ class TestNotesContent(TestNote):
                 response = self.author_client.get(url)
                 self.assertIn('form', response.context)
                 self.assertIsInstance(response.context['form'], NoteForm)
+
+    @override_settings(NOTES_COUNT_ON_PAGE=2)
+    def test_notes_list_keyset_pagination(self):
+        Note.objects.bulk_create(
+            Note(
+                title=f'Note {index}', text='Text', slug=f'note-{index}',
+                author=self.author
+            )
+            for index in range(4)
+        )
+        expected = list(
+            Note.objects.filter(author=self.author).order_by('id')
+        )
+        shown, params = [], {}
+        while True:
+            context = self.author_client.get(self.LIST_URL, params).context
+            page = context['object_list']
+            self.assertLessEqual(len(page), 2)
+            self.assertEqual(context['notes_count'], len(expected))
+            self.assertIn('text', page[0].get_deferred_fields())
+            shown.extend(page)
+            if context['next_after'] is None:
+                break
+            params = {'after': context['next_after']}
+        self.assertEqual(shown, expected)
+
+    def test_bad_page_parameters_give_404(self):
+        for url, params in (
+            (self.LIST_URL, {'after': '²'}),
+            (self.LIST_URL, {'after': 'x'}),
+            (self.LIST_URL, {'after': '-1'}),
+            (self.LIST_URL, {'after': str(2 ** 63)}),
+            (self.SEARCH_URL, {'q': 'x', 'page': '²'}),
+            (self.SEARCH_URL, {'q': 'x', 'page': '0'}),
+            (self.SEARCH_URL, {'q': 'x', 'page': str(2 ** 63)}),
+        ):
+            with self.subTest(url=url, params=params):
+                response = self.author_client.get(url, params)
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    @skipIf(connection.vendor != 'sqlite', 'EXPLAIN QUERY PLAN из SQLite')
+    def test_views_use_indexes(self):
+        urls = (
+            self.LIST_URL,
+            self.EDIT_URL,
+            self.DELETE_URL,
+            reverse('notes:detail', args=(self.note.slug,)),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as context:
+                    self.author_client.get(url)
+                for sql in (
+                    query['sql'] for query in context.captured_queries
+                    if query['sql'].startswith('SELECT')
+                ):
+                    with connection.cursor() as cursor:
+                        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                        plan = [step for *_, step in cursor.fetchall()]
+                    for step in plan:
+                        self.assertNotIn('TEMP B-TREE', step, sql)
+                        self.assertFalse(
+                            step.startswith('SCAN') and 'INDEX' not in step,
+                            sql
+                        )
@@ -1,4 +1,5 @@
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import Client, TestCase
 from django.urls import reverse
 
@@ -25,6 +26,10 @@ class TestNote(TestCase):
         cls.LIST_URL = reverse('notes:list')
         cls.ADD_URL = reverse('notes:add')
         cls.SUCCESS_URL = reverse('notes:success')
+        cls.SEARCH_URL = reverse('notes:search')
         cls.EDIT_URL = reverse('notes:edit', args=[cls.note.slug])
         cls.DELETE_URL = reverse('notes:delete', args=[cls.note.slug])
         cls.LOGIN_URL = reverse('users:login')
+
+    def setUp(self):
+        cache.clear()
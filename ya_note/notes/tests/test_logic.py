@@ -1,10 +1,24 @@
+from concurrent.futures import ThreadPoolExecutor
 from http import HTTPStatus
+from unittest.mock import patch
 from pytils.translit import slugify
 
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, connection
+from django.test import TransactionTestCase, override_settings
+
 from notes.forms import WARNING
 from notes.models import Note
+from notes.search import stem, tokenize
 from .test_lib import TestNote
 
+User = get_user_model()
+
+SAME_TITLE_NOTES = 2000
+# Тестовую базу не жалко: без fsync на каждую запись поток заметок
+# укладывается в несколько секунд.
+TEST_SQLITE_PRAGMAS = {'journal_mode': 'WAL', 'synchronous': 'OFF'}
+
 
 class TestNoteCreation(TestNote):
     @classmethod
@@ -43,6 +57,12 @@ class TestNoteCreation(TestNote):
             response, 'form', 'slug', self.note.slug + WARNING
         )
 
+    def test_other_integrity_errors_are_not_slug_errors(self):
+        error = IntegrityError('NOT NULL constraint failed: notes_note.text')
+        with patch.object(Note, 'save', side_effect=error):
+            with self.assertRaises(IntegrityError):
+                self.author_client.post(self.ADD_URL, data=self.form_data)
+
     def test_empty_slug(self):
         notes = Note.objects.all()
         notes.delete()
@@ -82,3 +102,81 @@ class TestNoteCreation(TestNote):
         response = self.non_author_client.post(self.DELETE_URL)
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
         self.assertEqual(Note.objects.count(), notes_count)
+
+
+@override_settings(SQLITE_PRAGMAS=TEST_SQLITE_PRAGMAS)
+class TestSlugAllocation(TransactionTestCase):
+
+    def test_same_title_notes_in_parallel(self):
+        author = User.objects.create(username='author')
+
+        def create_note(index):
+            try:
+                return Note.objects.create(
+                    title='Заметка', text=f'Текст {index}', author=author
+                ).slug
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            slugs = list(executor.map(create_note, range(SAME_TITLE_NOTES)))
+        self.assertEqual(len(set(slugs)), SAME_TITLE_NOTES)
+        self.assertEqual(Note.objects.count(), SAME_TITLE_NOTES)
+        self.assertIn(slugify('Заметка'), slugs)
+
+
+class TestNoteSearch(TestNote):
+
+    def search(self, query, client=None):
+        response = (client or self.author_client).get(
+            self.SEARCH_URL, {'q': query}
+        )
+        return list(response.context['object_list'])
+
+    def check_search(self):
+        first = Note.objects.create(
+            title='Покупки', text='Купить зелёные яблоки и хлеб',
+            author=self.author
+        )
+        second = Note.objects.create(
+            title='Яблоки', text='Рецепт пирога с яблоком',
+            author=self.author
+        )
+        Note.objects.create(
+            title='Яблоки', text='Чужая заметка', author=self.non_author
+        )
+        self.assertEqual(self.search('яблоко'), [second, first])
+        self.assertEqual(self.search('ЗЕЛЕНОЕ яблоко'), [first])
+        self.assertEqual(self.search('груша'), [])
+        first.text = 'Купить груши'
+        first.save()
+        self.assertEqual(self.search('груш'), [first])
+        self.assertEqual(self.search('яблоки'), [second])
+        second.delete()
+        self.assertEqual(self.search('яблоки'), [])
+
+    def test_search_with_available_backend(self):
+        self.check_search()
+
+    def test_search_with_inverted_index(self):
+        with patch('notes.search.use_fts', return_value=False):
+            self.check_search()
+
+    def test_stemming(self):
+        self.assertEqual(stem('заметками'), stem('заметка'))
+        self.assertEqual(tokenize('Ёлки, ЕЛКА'), ['елк', 'елк'])
+
+    @override_settings(NOTES_SEARCH_PAGE_SIZE=2)
+    def test_search_pagination(self):
+        for index in range(3):
+            Note.objects.create(
+                title=f'Список {index}', text='Дела', author=self.author
+            )
+        response = self.author_client.get(self.SEARCH_URL, {'q': 'дела'})
+        self.assertEqual(len(response.context['object_list']), 2)
+        self.assertEqual(response.context['next_page'], 2)
+        response = self.author_client.get(
+            self.SEARCH_URL, {'q': 'дела', 'page': 2}
+        )
+        self.assertEqual(len(response.context['object_list']), 1)
+        self.assertIsNone(response.context['next_page'])
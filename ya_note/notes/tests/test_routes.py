@@ -1,7 +1,12 @@
 from http import HTTPStatus
 
-from django.urls import reverse
+from django.conf import settings
+from django.test import Client, override_settings
+from django.urls import NoReverseMatch, reverse
 
+from yanote.metrics import view_stats
+from yanote.templating import warm_templates
+from yanote.urlbuilder import fast_reverse
 from .test_lib import TestNote
 
 
@@ -19,6 +24,7 @@ class TestRoutes(TestNote):
             cls.ADD_URL,
             cls.LIST_URL,
             cls.SUCCESS_URL,
+            cls.SEARCH_URL,
         ]
         cls.note_specific_urls = [
             cls.EDIT_URL,
@@ -53,3 +59,75 @@ class TestRoutes(TestNote):
             for url in self.note_specific_urls:
                 with self.subTest(user=user):
                     self.assertEqual(user.get(url).status_code, status)
+
+    @override_settings(
+        VIEW_METRICS=True, VIEW_BUDGETS={'notes:list': {'queries': 0}}
+    )
+    def test_view_metrics(self):
+        view_stats.reset()
+        client = Client()
+        client.force_login(self.author)
+        with self.assertLogs('yanote.metrics', level='WARNING'):
+            client.get(self.LIST_URL)
+        metrics = client.get(reverse('metrics')).json()['notes:list']
+        self.assertEqual(metrics['queries']['count'], 1)
+        self.assertGreater(metrics['template_ms']['sum'], 0)
+
+    @override_settings(TEMPLATE_PROFILING=True)
+    def test_template_profiling(self):
+        client = Client()
+        client.force_login(self.author)
+        with self.assertLogs('yanote.templating', level='INFO'):
+            response = client.get(self.LIST_URL)
+        profile = response.wsgi_request.template_profile
+        self.assertEqual(profile.calls[('notes/list.html', 0, 'template')], 1)
+        self.assertIn('tpl0;desc=', response['Server-Timing'])
+
+    def test_warm_templates_compiles_every_template(self):
+        templates = settings.BASE_DIR / 'templates'
+        self.assertEqual(warm_templates(), sum(
+            path.is_file() for path in templates.rglob('*')
+        ))
+
+    def test_fast_reverse_matches_reverse(self):
+        for slug in (self.note.slug, 'note_2-b', 'x'):
+            with self.subTest(slug=slug):
+                self.assertEqual(
+                    fast_reverse('notes:detail', slug),
+                    reverse('notes:detail', args=(slug,))
+                )
+        for slug in ('с пробелом', 'a/b', ''):
+            with self.subTest(slug=slug):
+                with self.assertRaises(NoReverseMatch):
+                    fast_reverse('notes:detail', slug)
+
+    def test_detail_conditional_get(self):
+        url = reverse('notes:detail', args=(self.note.slug,))
+        response = self.author_client.get(url)
+        self.assertTrue(response.has_header('Last-Modified'))
+        etag = response['ETag']
+        # Сессия, пользователь и время изменения заметки.
+        with self.assertNumQueries(3):
+            response = self.author_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        self.author_client.post(self.EDIT_URL, {
+            'title': self.note.title, 'text': 'Edited', 'slug': self.note.slug
+        })
+        response = self.author_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    @override_settings(
+        CACHED_AUTH=True,
+        SESSION_ENGINE='django.contrib.sessions.backends.cached_db',
+    )
+    def test_cached_session_and_user(self):
+        client = Client()
+        client.force_login(self.author)
+        client.get(self.SUCCESS_URL)
+        with self.assertNumQueries(0):
+            response = client.get(self.SUCCESS_URL)
+        self.assertEqual(response.context['user'], self.author)
+        self.author.set_password('new-password')
+        self.author.save()
+        redirect_url = f'{self.LOGIN_URL}?next={self.SUCCESS_URL}'
+        self.assertRedirects(client.get(self.SUCCESS_URL), redirect_url)
@@ -1,9 +1,34 @@
+from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.db import IntegrityError, transaction
+from django.http import Http404, HttpResponseRedirect
 from django.urls import reverse_lazy
+from django.utils.decorators import method_decorator
 from django.views import generic
+from django.views.decorators.http import condition
 
-from .forms import NoteForm
+from .counters import get_notes_count
+from .forms import WARNING, NoteForm
 from .models import Note
+from .search import search
+
+# Наибольшее целое SQLite: большие числа в запросе дают OverflowError.
+MAX_INTEGER = 2 ** 63 - 1
+
+
+def note_last_modified(request, slug):
+    """Время изменения заметки без загрузки её текста."""
+    if not hasattr(request, 'note_updated'):
+        request.note_updated = Note.objects.filter(
+            author=request.user, slug=slug
+        ).values_list('updated', flat=True).first()
+    return request.note_updated
+
+
+def note_etag(request, slug):
+    # Last-Modified точен до секунды, ETag различает и более частые правки.
+    updated = note_last_modified(request, slug)
+    return updated and f'{slug}:{updated.timestamp()}'
 
 
 class Home(generic.TemplateView):
@@ -26,22 +51,42 @@ class NoteBase(LoginRequiredMixin):
         return self.model.objects.filter(author=self.request.user)
 
 
-class NoteCreate(NoteBase, generic.CreateView):
-    """Добавление заметки."""
+class NoteFormMixin(NoteBase):
+    """Сохранение заметки из формы."""
     template_name = 'notes/form.html'
     form_class = NoteForm
 
     def form_valid(self, form):
-        new_note = form.save(commit=False)
-        new_note.author = self.request.user
-        new_note.save()
+        """Занятый slug обнаруживает уникальный индекс, а не запрос.
+
+        Остальные нарушения целостности не относятся к форме и
+        пробрасываются дальше.
+        """
+        note = form.save(commit=False)
+        try:
+            with transaction.atomic():
+                note.save()
+        except IntegrityError:
+            if not Note.objects.filter(slug=note.slug).exclude(
+                pk=note.pk
+            ).exists():
+                raise
+            form.add_error('slug', note.slug + WARNING)
+            return self.form_invalid(form)
+        self.object = note
+        return HttpResponseRedirect(self.get_success_url())
+
+
+class NoteCreate(NoteFormMixin, generic.CreateView):
+    """Добавление заметки."""
+
+    def form_valid(self, form):
+        form.instance.author = self.request.user
         return super().form_valid(form)
 
 
-class NoteUpdate(NoteBase, generic.UpdateView):
+class NoteUpdate(NoteFormMixin, generic.UpdateView):
     """Редактирование заметки."""
-    template_name = 'notes/form.html'
-    form_class = NoteForm
 
 
 class NoteDelete(NoteBase, generic.DeleteView):
@@ -50,10 +95,73 @@ class NoteDelete(NoteBase, generic.DeleteView):
 
 
 class NotesList(NoteBase, generic.ListView):
-    """Список всех заметок пользователя."""
+    """Список всех заметок пользователя.
+
+    Заметки выводятся страницами по индексу (author, id): следующая
+    страница начинается после id из параметра after, поэтому её
+    стоимость не зависит от того, сколько заметок уже пролистано.
+    """
     template_name = 'notes/list.html'
 
+    def get_queryset(self):
+        """Загружаем только поля, которые выводит шаблон."""
+        notes = super().get_queryset().only(
+            'id', 'slug', 'title'
+        ).order_by('id')
+        after = self.request.GET.get('after')
+        if after is not None:
+            try:
+                after = int(after)
+            except ValueError:
+                raise Http404('Некорректный параметр after.')
+            if not 0 <= after <= MAX_INTEGER:
+                raise Http404('Некорректный параметр after.')
+            notes = notes.filter(id__gt=after)
+        return notes[:settings.NOTES_COUNT_ON_PAGE + 1]
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        notes = list(context['object_list'])
+        size = settings.NOTES_COUNT_ON_PAGE
+        context['object_list'] = context['note_list'] = notes[:size]
+        context['next_after'] = (
+            notes[size - 1].id if len(notes) > size else None
+        )
+        context['notes_count'] = get_notes_count(self.request.user.id)
+        return context
+
 
 class NoteDetail(NoteBase, generic.DetailView):
     """Заметка подробно."""
     template_name = 'notes/detail.html'
+
+    @method_decorator(condition(note_etag, note_last_modified))
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+
+class NoteSearch(NoteBase, generic.TemplateView):
+    """Поиск по заметкам пользователя с ранжированием по релевантности."""
+    template_name = 'notes/search.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        query = self.request.GET.get('q', '').strip()
+        try:
+            page = int(self.request.GET.get('page', 1))
+        except ValueError:
+            raise Http404('Некорректный номер страницы.')
+        size = settings.NOTES_SEARCH_PAGE_SIZE
+        # Смещение (page - 1) * size тоже должно поместиться в целое SQLite.
+        if not 1 <= page <= MAX_INTEGER // size:
+            raise Http404('Некорректный номер страницы.')
+        notes = search(
+            self.request.user.id, query, (page - 1) * size, size + 1
+        ) if query else []
+        context.update(
+            query=query,
+            object_list=notes[:size],
+            previous_page=page - 1 if page > 1 else None,
+            next_page=page + 1 if len(notes) > size else None,
+        )
+        return context
@@ -0,0 +1,234 @@
+"""Учёт стоимости представлений: запросы к БД, время SQL, шаблонов и ответа.
+
+Middleware включается настройкой VIEW_METRICS, копит гистограммы в памяти
+процесса по имени URL (news:home, notes:list, ...) и пишет предупреждение
+в лог, когда представление выходит за бюджет из VIEW_BUDGETS. Запросы к
+БД считает обёртка соединений, которая читает замер текущего запроса из
+ContextVar: sync_to_async передаёт его и в потоки представлений под ASGI.
+"""
+import asyncio
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import Http404, JsonResponse
+from django.utils.deprecation import MiddlewareMixin
+
+logger = logging.getLogger(__name__)
+
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+TIME_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+LOCAL_ADDRESSES = ('127.0.0.1', '::1')
+
+current_sample = ContextVar('view_metrics_sample', default=None)
+
+
+class Histogram:
+    """Гистограмма с фиксированными границами корзин."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0
+        self.max = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def as_dict(self):
+        bounds = [str(bound) for bound in self.buckets] + ['+Inf']
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 3),
+            'max': round(self.max, 3),
+            'buckets': dict(zip(bounds, self.counts)),
+        }
+
+
+class ViewStats:
+    """Накопленные гистограммы по именам URL."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def record(self, view_name, sample):
+        with self._lock:
+            histograms = self._views.setdefault(view_name, {
+                'queries': Histogram(QUERY_BUCKETS),
+                'sql_ms': Histogram(TIME_BUCKETS_MS),
+                'template_ms': Histogram(TIME_BUCKETS_MS),
+                'wall_ms': Histogram(TIME_BUCKETS_MS),
+            })
+            for metric, histogram in histograms.items():
+                histogram.observe(sample[metric])
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                view_name: {
+                    metric: histogram.as_dict()
+                    for metric, histogram in histograms.items()
+                }
+                for view_name, histograms in self._views.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+
+view_stats = ViewStats()
+
+
+def get_budget(view_name):
+    """Бюджет представления поверх общего бюджета 'default'."""
+    budgets = getattr(settings, 'VIEW_BUDGETS', {})
+    return {**budgets.get('default', {}), **budgets.get(view_name, {})}
+
+
+def count_query(execute, sql, params, many, context):
+    sample = current_sample.get()
+    if sample is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        sample['queries'] += 1
+        sample['sql_ms'] += (time.perf_counter() - started) * 1000
+
+
+def install(sender=None, connection=None, **kwargs):
+    """Ставит count_query на соединение; повторный вызов ничего не меняет.
+
+    Обёртка встаёт первой, чтобы execute_wrapper() снимал со списка свои.
+    """
+    if count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, count_query)
+
+
+class ViewMetricsMiddleware(MiddlewareMixin):
+    """Замеряет каждый запрос и складывает результат в view_stats."""
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'VIEW_METRICS', False):
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        # Соединения других потоков откроются позже.
+        connection_created.connect(install)
+        for connection in connections.all():
+            install(connection=connection)
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self):
+            return self.__acall__(request)
+        token, started = self.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_sample.reset(token)
+        return self.finish(request, started, response)
+
+    async def __acall__(self, request):
+        token, started = self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_sample.reset(token)
+        return self.finish(request, started, response)
+
+    @staticmethod
+    def start(request):
+        sample = {'queries': 0, 'sql_ms': 0.0, 'template_ms': 0.0}
+        request.view_metrics = sample
+        return current_sample.set(sample), time.perf_counter()
+
+    def finish(self, request, started, response):
+        if response.streaming:
+            response.streaming_content = self.measure_stream(
+                request, started, response.streaming_content
+            )
+        else:
+            self.complete(request, started)
+        return response
+
+    def measure_stream(self, request, started, content):
+        """Тело потокового ответа читается уже после middleware.
+
+        Замер учитывает запросы, сделанные при чтении, и записывается,
+        когда сервер дочитал или закрыл поток.
+        """
+        sample = request.view_metrics
+        iterator = iter(content)
+        try:
+            while True:
+                # Генератор работает в контексте сервера: замер ставим
+                # только на время получения очередного куска.
+                token = current_sample.set(sample)
+                try:
+                    chunk = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    current_sample.reset(token)
+                yield chunk
+        finally:
+            self.complete(request, started)
+
+    def complete(self, request, started):
+        sample = request.view_metrics
+        sample['wall_ms'] = (time.perf_counter() - started) * 1000
+        if request.resolver_match is not None:
+            self.record(request.resolver_match.view_name, sample)
+
+    def process_template_response(self, request, response):
+        """Шаблон рендерится после middleware, поэтому оборачиваем render."""
+        render = response.render
+        sample = request.view_metrics
+
+        def timed_render():
+            started = time.perf_counter()
+            try:
+                return render()
+            finally:
+                sample['template_ms'] += (
+                    time.perf_counter() - started
+                ) * 1000
+
+        response.render = timed_render
+        return response
+
+    @staticmethod
+    def record(view_name, sample):
+        view_stats.record(view_name, sample)
+        exceeded = [
+            f'{metric}={sample[metric]:.0f} > {limit}'
+            for metric, limit in get_budget(view_name).items()
+            if sample.get(metric, 0) > limit
+        ]
+        if exceeded:
+            logger.warning(
+                'Представление %s вышло за бюджет: %s',
+                view_name, ', '.join(exceeded)
+            )
+
+
+def metrics_view(request):
+    """Гистограммы по представлениям, доступны только с localhost."""
+    if (
+        not getattr(settings, 'VIEW_METRICS', False)
+        or request.META.get('REMOTE_ADDR') not in LOCAL_ADDRESSES
+    ):
+        raise Http404
+    return JsonResponse(view_stats.snapshot())
@@ -22,11 +22,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'yanote.metrics.ViewMetricsMiddleware',
+    'yanote.templating.TemplateProfilerMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'yanote.auth.CachedUserMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -45,6 +48,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            'libraries': {'fast_url': 'yanote.urlbuilder'},
         },
     },
 ]
@@ -56,6 +60,9 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Файловая тестовая база нужна тестам с несколькими потоками:
+        # общая база в памяти отвечает им «database table is locked».
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
@@ -87,3 +94,22 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 LOGIN_URL = reverse_lazy('users:login')
 LOGIN_REDIRECT_URL = reverse_lazy('notes:home')
+
+NOTES_COUNT_ON_PAGE = 100
+NOTES_COUNT_TIMEOUT = 60 * 60
+NOTES_SEARCH_PAGE_SIZE = 20
+
+VIEW_METRICS = False
+VIEW_BUDGETS = {
+    'default': {'queries': 10, 'wall_ms': 200},
+}
+
+# Время шаблонов, include и тегов за запрос, см. yanote/templating.py.
+TEMPLATE_PROFILING = False
+TEMPLATE_PROFILING_TOP = 15
+
+# Сессия и пользователь из кеша, см. yanote/auth.py. Включать вместе с
+# SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'.
+CACHED_AUTH = False
+AUTH_CACHE_ALIAS = 'default'
+AUTH_CACHE_TIMEOUT = 60 * 5
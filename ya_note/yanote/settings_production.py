@@ -0,0 +1,73 @@
+"""Профиль для продакшена.
+
+Включается переменной окружения
+DJANGO_SETTINGS_MODULE=yanote.settings_production,
+секреты и пути задаются переменными окружения DJANGO_*.
+"""
+import os
+from pathlib import Path
+
+from .settings import *  # noqa: F401, F403
+from .settings import BASE_DIR, DATABASES, TEMPLATES
+
+DEBUG = False
+
+# Без ключа из окружения профиль не загружается: ключ из settings.py
+# лежит в репозитории.
+SECRET_KEY = os.environ['DJANGO_SECRET_KEY']
+
+ALLOWED_HOSTS = os.environ.get(
+    'DJANGO_ALLOWED_HOSTS', 'localhost,127.0.0.1'
+).split(',')
+
+DATA_DIR = Path(os.environ.get('DJANGO_DATA_DIR', BASE_DIR / 'var'))
+
+DATABASES = {
+    'default': {
+        **DATABASES['default'],
+        # Соединение переживает запрос и не открывается заново каждый раз.
+        'CONN_MAX_AGE': int(os.environ.get('DJANGO_CONN_MAX_AGE', 600)),
+        'OPTIONS': {'timeout': 20},
+    }
+}
+
+# WAL позволяет читать параллельно с записью; при WAL synchronous=NORMAL
+# не теряет целостность, а лишь последние транзакции при сбое питания.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'cache_size': -20000,
+    'temp_store': 'MEMORY',
+    'mmap_size': 128 * 1024 * 1024,
+}
+
+TEMPLATES = [{
+    **TEMPLATES[0],
+    'APP_DIRS': False,
+    'OPTIONS': {
+        **TEMPLATES[0]['OPTIONS'],
+        'loaders': [(
+            'django.template.loaders.cached.Loader', [
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ],
+        )],
+    },
+}]
+
+# incr() в FileBasedCache не атомарен между процессами; счётчики через
+# incr() на этот кеш не полагаются.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': DATA_DIR / 'cache',
+        'TIMEOUT': 60 * 60,
+        'OPTIONS': {'MAX_ENTRIES': 100_000},
+    }
+}
+
+SESSION_ENGINE = 'django.contrib.sessions.backends.file'
+# Каталог сессий создаётся при развёртывании, кеш создаёт свой сам:
+# mkdir -p "$DJANGO_DATA_DIR/sessions".
+SESSION_FILE_PATH = DATA_DIR / 'sessions'
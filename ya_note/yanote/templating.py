@@ -0,0 +1,166 @@
+"""Профилирование шаблонов и их прогрев при старте.
+
+Профилирование включается настройкой TEMPLATE_PROFILING: middleware
+замеряет за запрос время каждого шаблона, include и тега, пишет самые
+дорогие в лог и в заголовок Server-Timing. Время вложенных узлов входит
+и в родительские. Прогрев из wsgi.py и asgi.py компилирует все шаблоны
+из DIRS, и с кеширующим загрузчиком первый запрос их уже не разбирает.
+"""
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.template import engines
+from django.template.base import Node, Template, TokenType
+from django.utils.deprecation import MiddlewareMixin
+
+logger = logging.getLogger(__name__)
+
+current_profile = ContextVar('template_profile', default=None)
+
+
+class TemplateProfile:
+    """Число вызовов и суммарное время по ключу (шаблон, строка, узел)."""
+
+    def __init__(self):
+        self.calls = defaultdict(int)
+        self.total_ms = defaultdict(float)
+
+    def observe(self, key, elapsed_ms):
+        self.calls[key] += 1
+        self.total_ms[key] += elapsed_ms
+
+    def top(self, limit):
+        return sorted(
+            self.total_ms.items(), key=lambda item: item[1], reverse=True
+        )[:limit]
+
+
+def template_key(template):
+    return (template.name or '<string>', 0, 'template')
+
+
+def node_key(node):
+    """Ключ считается один раз: узлы живут в кеше шаблонов."""
+    key = node.__dict__.get('_profile_key')
+    if key is None:
+        origin = getattr(node, 'origin', None)
+        token = getattr(node, 'token', None)
+        if token is None:
+            label, line = type(node).__name__, 0
+        elif token.token_type == TokenType.BLOCK:
+            label = '{%% %s %%}' % token.split_contents()[0]
+            line = token.lineno
+        else:
+            label, line = '{{ %s }}' % token.contents, token.lineno
+        key = node._profile_key = (
+            getattr(origin, 'template_name', None) or '<string>', line, label
+        )
+    return key
+
+
+def profiled(render, key):
+    def wrapper(self, context):
+        profile = current_profile.get()
+        if profile is None:
+            return render(self, context)
+        started = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            profile.observe(
+                key(self), (time.perf_counter() - started) * 1000
+            )
+
+    wrapper.profiled = True
+    return wrapper
+
+
+def install():
+    """Оборачивает рендер узлов и шаблонов; повторный вызов ничего не меняет.
+
+    Вне профилируемого запроса обёртка только читает ContextVar.
+    """
+    if getattr(Node.render_annotated, 'profiled', False):
+        return
+    Node.render_annotated = profiled(Node.render_annotated, node_key)
+    Template._render = profiled(Template._render, template_key)
+
+
+def describe(key):
+    template_name, line, label = key
+    return f'{template_name}:{line} {label}' if line else template_name
+
+
+class TemplateProfilerMiddleware(MiddlewareMixin):
+    """Собирает профиль шаблонов каждого запроса в request.template_profile.
+
+    Под ASGI профиль доходит до потоков представлений через ContextVar.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'TEMPLATE_PROFILING', False):
+            raise MiddlewareNotUsed
+        install()
+        super().__init__(get_response)
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self):
+            return self.__acall__(request)
+        profile = request.template_profile = TemplateProfile()
+        token = current_profile.set(profile)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_profile.reset(token)
+        return self.report(request, response)
+
+    async def __acall__(self, request):
+        profile = request.template_profile = TemplateProfile()
+        token = current_profile.set(profile)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_profile.reset(token)
+        return self.report(request, response)
+
+    @staticmethod
+    def report(request, response):
+        profile = request.template_profile
+        top = profile.top(settings.TEMPLATE_PROFILING_TOP)
+        if not top:
+            return response
+        response['Server-Timing'] = ', '.join(
+            'tpl{};desc="{}";dur={:.2f}'.format(
+                index,
+                describe(key).replace('"', "'").encode(
+                    'ascii', 'replace'
+                ).decode(),
+                elapsed_ms,
+            )
+            for index, (key, elapsed_ms) in enumerate(top)
+        )
+        logger.info('Шаблоны %s:\n%s', request.path, '\n'.join(
+            f'{elapsed_ms:9.2f} мс {profile.calls[key]:6}x  {describe(key)}'
+            for key, elapsed_ms in top
+        ))
+        return response
+
+
+def warm_templates():
+    """Компилирует все шаблоны из DIRS и возвращает их число."""
+    count = 0
+    for engine in engines.all():
+        for directory in map(Path, engine.dirs):
+            for path in sorted(directory.rglob('*')):
+                if path.is_file():
+                    engine.get_template(
+                        path.relative_to(directory).as_posix()
+                    )
+                    count += 1
+    return count